@@ -0,0 +1,66 @@
+# Cliente asíncrono de Drive (compradia.drive_async) contra el síncrono (googleapiclient en hilos), ambos contra
+# el Drive HTTP local con latencia simulada: descarga de los MASTER y metadatos de muchos archivos (uno por uno
+# contra lotes de 100).
+# Uso: python -m benchmarks.bench_drive_async --partes 20000 --latencia 0.05 --metadatos 300
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks import bench_pipeline, datos
+from benchmarks.drive_http import DriveHTTP
+from compradia.config import CONFIG
+from compradia import drive, drive_async
+
+def cronometrar(funcion, servidor):
+    servidor.peticiones.clear()
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return resultado, round(time.perf_counter() - inicio, 3), dict(servidor.peticiones)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--partes", type=int, default=20_000)
+    parser.add_argument("--latencia", type=float, default=0.05, help="Segundos por respuesta del servidor local")
+    parser.add_argument("--copias", type=int, default=8, help="Copias de cada MASTER en la carpeta de ventas")
+    parser.add_argument("--metadatos", type=int, default=300, help="Archivos para la prueba de metadatos")
+    args = parser.parse_args()
+
+    falso, _, ventas = bench_pipeline.preparar_drive(datos.numeros_parte(args.partes), 1.0)
+    masters = [meta for meta in falso.archivos.values() if ventas in meta['parents']]
+    ids = [falso.agregar(f"{k} {meta['name']}", falso.contenido(meta['id']), parents=[ventas])['id']
+           for meta in masters for k in range(args.copias)]
+    sueltos = [falso.agregar(f"archivo_{k}.txt", b"x", parents=[ventas])['id'] for k in range(args.metadatos)]
+    servidor = DriveHTTP(falso, args.latencia).iniciar()
+    CONFIG.update({'drive_url': servidor.url, 'gcp_service_account': {'falso': True}})
+    drive.fijar_servicio_drive(None)
+    try:
+        # Conexiones y clientes armados antes de medir (el primer uso de cada uno paga importaciones y arranque)
+        with drive.cliente_drive() as servicio: servicio.files().get(fileId=ids[0]).execute()
+        drive_async.metadatos_lote(ids[:1])
+
+        def hilos():
+            with ThreadPoolExecutor(max_workers=CONFIG['max_descargas']) as pool:
+                return dict(zip(ids, pool.map(drive.descargar_archivo_drive, ids)))
+        sincrono, t_sinc, p_sinc = cronometrar(hilos, servidor)
+        asincrono, t_asinc, p_asinc = cronometrar(lambda: drive_async.descargar_archivos(ids), servidor)
+        assert all(sincrono[i].getvalue() == asincrono[i].getvalue() == falso.contenido(i) for i in ids)
+        megas = sum(len(falso.contenido(i)) for i in ids) / 1024 / 1024
+        print(f"== Descarga de {len(ids)} MASTER ({megas:.1f} MB, latencia {args.latencia * 1000:.0f} ms) ==")
+        print(f"  hilos + googleapiclient ({CONFIG['max_descargas']} hilos)   {t_sinc:7.3f} s | peticiones {p_sinc}")
+        print(f"  drive_async ({CONFIG['conexiones_drive']} conexiones)          {t_asinc:7.3f} s | peticiones {p_asinc}")
+
+        def uno_por_uno():
+            with drive.cliente_drive() as servicio:
+                return {i: servicio.files().get(fileId=i, fields="id, name").execute() for i in sueltos}
+        _, t_uno, p_uno = cronometrar(uno_por_uno, servidor)
+        metas, t_lote, p_lote = cronometrar(lambda: drive_async.metadatos_lote(sueltos, "id, name"), servidor)
+        assert all(metas[i]['name'] == falso.archivos[i]['name'] for i in sueltos)
+        print(f"== Metadatos de {len(sueltos)} archivos ==")
+        print(f"  files.get uno por uno                 {t_uno:7.3f} s | peticiones {p_uno}")
+        print(f"  drive_async.metadatos_lote            {t_lote:7.3f} s | peticiones {p_lote}")
+    finally:
+        servidor.detener()
+        CONFIG['drive_url'] = None
+        drive.fijar_servicio_drive(None)
+
+if __name__ == "__main__":
+    main()
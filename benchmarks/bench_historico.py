@@ -0,0 +1,72 @@
+# Micro-benchmark del cálculo de HITS / PROMEDIO sobre un histórico sintético.
+# Uso: python -m benchmarks.bench_historico --filas 5000000
+import argparse
+import datetime
+import time
+import numpy as np
+import pandas as pd
+from compradia.ventas import agregar_mensual, mapear_mes_a_numero, periodos_ventana, resumir_ventana
+
+MESES = ['ENERO', 'FEBRERO', 'MARZO', 'ABRIL', 'MAYO', 'JUNIO', 'JULIO', 'AGOSTO',
+         'SEPTIEMBRE', 'OCTUBRE', 'NOVIEMBRE', 'DICIEMBRE', 'ene', ' Feb ', 'MAR']
+
+def historico_sintetico(filas, partes, semilla=0):
+    rng = np.random.default_rng(semilla)
+    nps = np.array([f"{i:08d}" for i in range(partes)] + [' 00000001 ', np.nan], dtype=object) # NaN = celda vacía, como la entrega read_excel
+    cantidades = rng.integers(-2, 12, filas).astype(object)
+    cantidades[rng.random(filas) < 0.001] = 'N/D'
+    return pd.DataFrame({
+        'AÑO': rng.choice([2024, 2025, 2026], filas),
+        'MES': rng.choice(np.array(MESES, dtype=object), filas),
+        'NP': rng.choice(nps, filas),
+        'CANTIDAD': cantidades,
+    })
+
+def calcular_legacy(df_total, p_inicio, p_fin):
+    # Camino anterior: apply por fila, lambda por grupo y NP re-convertido a str
+    df_total = df_total.copy()
+    df_total['AÑO'] = pd.to_numeric(df_total['AÑO'], errors='coerce').fillna(0).astype(int)
+    df_total['MES_NUM'] = df_total['MES'].astype(str).apply(mapear_mes_a_numero)
+    df_total['PERIODO'] = (df_total['AÑO'] * 100) + df_total['MES_NUM']
+    mask = (df_total['PERIODO'] >= p_inicio) & (df_total['PERIODO'] < p_fin)
+    df_filtrado = df_total.loc[mask].copy()
+    df_filtrado['NP'] = df_filtrado['NP'].astype(str).str.strip()
+    df_filtrado['CANTIDAD'] = pd.to_numeric(df_filtrado['CANTIDAD'], errors='coerce').fillna(0)
+    resumen = df_filtrado.groupby('NP').agg(
+        total_eventos=('CANTIDAD', 'count'),
+        eventos_negativos=('CANTIDAD', lambda x: (x < 0).sum()),
+        suma_cantidad=('CANTIDAD', 'sum')
+    ).reset_index()
+    resumen['HITS_CALCULADO'] = (resumen['total_eventos'] - (resumen['eventos_negativos'] * 2)).clip(lower=0)
+    resumen['PROMEDIO_CALCULADO'] = resumen['suma_cantidad'] / 12
+    return resumen[['NP', 'HITS_CALCULADO', 'PROMEDIO_CALCULADO']]
+
+def calcular_vectorizado(df_total, p_inicio, p_fin):
+    resumen = resumir_ventana(agregar_mensual(df_total), p_inicio, p_fin, meses=12)
+    return resumen[['NP', 'HITS_CALCULADO', 'PROMEDIO_CALCULADO']]
+
+def cronometrar(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del cálculo de HITS / PROMEDIO")
+    parser.add_argument('--filas', type=int, default=5_000_000)
+    parser.add_argument('--partes', type=int, default=60_000)
+    args = parser.parse_args()
+
+    df = historico_sintetico(args.filas, args.partes)
+    p_inicio, p_fin = periodos_ventana(12, datetime.datetime(2026, 1, 15))
+
+    legacy, t_legacy = cronometrar(calcular_legacy, df, p_inicio, p_fin)
+    vectorizado, t_vect = cronometrar(calcular_vectorizado, df, p_inicio, p_fin)
+    pd.testing.assert_frame_equal(legacy.reset_index(drop=True), vectorizado.reset_index(drop=True))
+
+    print(f"Filas: {args.filas:,} | Partes: {args.partes:,} | Periodo: {p_inicio} a {p_fin}")
+    print(f"Legacy:      {t_legacy:8.2f} s")
+    print(f"Vectorizado: {t_vect:8.2f} s  ({t_legacy / t_vect:.1f}x)")
+    print("Resultados idénticos ✔")
+
+if __name__ == '__main__':
+    main()
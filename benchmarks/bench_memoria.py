@@ -0,0 +1,101 @@
+# Memoria del reporte DIA: pico de RSS del proceso durante el reporte, RSS al cerrar cada etapa y tamaño de
+# los DataFrames intermedios (entradas cargadas y hojas). Cada medición corre en un proceso nuevo y el pico
+# se reinicia (Linux: /proc/self/clear_refs) después de llenar la caché del histórico.
+# Uso: python -m benchmarks.bench_memoria --partes 100000 [--detallada]   (--detallada: pico de tracemalloc por etapa)
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+
+def generar(directorio, partes, filas_por_parte):
+    from benchmarks import bench_pipeline, datos
+    nps = datos.numeros_parte(partes)
+    archivos = bench_pipeline.generar_archivos(nps)
+    drive, _, ventas = bench_pipeline.preparar_drive(nps, filas_por_parte)
+    masters = [(meta['name'], drive.contenido(meta['id'])) for meta in drive.archivos.values() if ventas in meta['parents']]
+    os.makedirs(directorio, exist_ok=True)
+    with open(os.path.join(directorio, "entradas.pkl"), 'wb') as f: pickle.dump((archivos, masters), f)
+
+def tamano_mb(df):
+    return round(df.memory_usage(index=True, deep=True).sum() / 1024 / 1024, 1) if df is not None else 0
+
+def reiniciar_pico_rss():
+    with open("/proc/self/clear_refs", "w") as f: f.write("5")
+
+def pico_rss_mb():
+    # VmHWM se puede reiniciar; ru_maxrss no
+    with open("/proc/self/status") as f:
+        for linea in f:
+            if linea.startswith("VmHWM:"): return round(int(linea.split()[1]) / 1024, 1)
+
+def medir(directorio, detallada=False):
+    from compradia import perf
+    from compradia.config import CONFIG, AGENCIAS
+    from compradia.drive import fijar_servicio_drive
+    from compradia import reporte
+    from benchmarks import bench_pipeline
+    from benchmarks.drive_falso import CARPETA, DriveFalso
+    with open(os.path.join(directorio, "entradas.pkl"), 'rb') as f: archivos, masters = pickle.load(f)
+    drive = DriveFalso()
+    salida = drive.agregar("COMPRAS DIA", parents=["raiz"], mime_type=CARPETA)['id']
+    ventas = drive.agregar("VENTAS", parents=["raiz"], mime_type=CARPETA)['id']
+    for nombre, contenido in masters: drive.agregar(nombre, contenido, parents=[ventas])
+    CONFIG.update({'cache_dir': os.path.join(directorio, "cache"), 'drive_folder_id': salida, 'master_sales_id': ventas,
+                   'gcp_service_account': {'falso': True}})
+    fijar_servicio_drive(drive)
+
+    # Tamaño de lo que queda vivo entre etapas: las entradas ya cargadas y las hojas armadas
+    entradas_vivas = {}
+    cargar_original = reporte.cargar_entradas
+    def cargar_y_medir(*args, **kwargs):
+        entradas = cargar_original(*args, **kwargs)
+        entradas_vivas.update(entradas)
+        return entradas
+    reporte.cargar_entradas = cargar_y_medir
+
+    reporte.calcular_bi_agencias(AGENCIAS) # Caché del histórico lista: se mide el reporte, no la descarga
+    reiniciar_pico_rss()
+    perf.iniciar_corrida(memoria_detallada=detallada)
+    inicio = time.perf_counter()
+    buffer, hojas, _ = reporte.generar_reporte(AGENCIAS, bench_pipeline.abrir(archivos), 'drive')
+    total = time.perf_counter() - inicio
+    eventos = perf.terminar_corrida()
+    rss_etapa = {}
+    for ev in eventos:
+        if ev.get('rss_mb') is not None: rss_etapa[ev['etapa']] = max(rss_etapa.get(ev['etapa'], 0), ev['rss_mb'])
+    resultado = {
+        'total_s': round(total, 2),
+        'pico_rss_mb': pico_rss_mb(),
+        'rss_fin_etapa_mb': rss_etapa,
+        'entradas_mb': {f"{n}.{k}": tamano_mb(df) for n, e in entradas_vivas.items() for k, df in e.items()},
+        'hojas_mb': {n: tamano_mb(df) for n, df in hojas.items()},
+    }
+    if detallada: resultado['pico_etapa_mb'] = {fila['etapa']: fila.get('pico_tracemalloc_mb') for fila in perf.resumen(eventos)}
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--partes", type=int, default=100_000)
+    parser.add_argument("--filas-por-parte", type=float, default=1.0)
+    parser.add_argument("--directorio", help="Reusar (o dejar) los datos generados en este directorio")
+    parser.add_argument("--detallada", action="store_true", help="Pico de tracemalloc por etapa (mucho más lento)")
+    parser.add_argument("--solo-medir", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.solo_medir:
+        print(json.dumps(medir(args.directorio, args.detallada)))
+        return
+    directorio = args.directorio or tempfile.mkdtemp(prefix="compradia_mem_")
+    if not os.path.exists(os.path.join(directorio, "entradas.pkl")): generar(directorio, args.partes, args.filas_por_parte)
+    hijo = subprocess.run([sys.executable, "-m", "benchmarks.bench_memoria", "--solo-medir", "--directorio", directorio]
+                          + (["--detallada"] if args.detallada else []),
+                          capture_output=True, text=True, check=True)
+    resultado = json.loads(hijo.stdout.strip().splitlines()[-1])
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
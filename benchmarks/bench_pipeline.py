@@ -0,0 +1,130 @@
+# Benchmark de punta a punta del reporte DIA con datos sintéticos y un Drive local (sin red).
+# Uso:
+#   python -m benchmarks.bench_pipeline --partes 10000 100000 1000000
+#   python -m benchmarks.bench_pipeline --partes 10000 --guardar-base     (actualiza benchmarks/base_pipeline.json)
+#   python -m benchmarks.bench_pipeline --partes 10000 --comparar         (compara contra la base guardada)
+# Cada escala corre dos veces: "frio" (caché del histórico vacía: descarga + parseo) y "caliente" (caché llena).
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+from benchmarks import datos
+from benchmarks.drive_falso import CARPETA, DriveFalso
+from compradia import perf
+from compradia.cargas import limpiar_cache_cargas
+from compradia.config import CONFIG, AGENCIAS
+from compradia.drive import fijar_servicio_drive, subir_excel_a_drive
+from compradia.reporte import TIPOS_ARCHIVO, generar_reporte, nombre_reporte
+from compradia.ventas import periodos_ventana
+
+RUTA_BASE = os.path.join(os.path.dirname(__file__), "base_pipeline.json")
+TOLERANCIA = 1.25 # Más de 25% arriba de la base se marca como regresión
+
+def preparar_drive(nps, filas_por_parte, semilla=0):
+    drive = DriveFalso()
+    salida = drive.agregar("COMPRAS DIA", parents=["raiz"], mime_type=CARPETA)
+    ventas = drive.agregar("VENTAS", parents=["raiz"], mime_type=CARPETA)
+    p_inicio, p_fin = periodos_ventana(12)
+    for k, a in enumerate(AGENCIAS):
+        for anio in range(p_inicio // 100, p_fin // 100 + 1):
+            contenido = datos.master_ventas(nps, anio, filas_por_parte, semilla + 100 * k + anio)
+            drive.agregar(f"MASTER VENTAS {a['nombre']} {anio}.xlsx", contenido, parents=[ventas['id']])
+    return drive, salida['id'], ventas['id']
+
+def generar_archivos(nps, semilla=0):
+    generadores = {'sug': datos.sugerido, 'trans': datos.transito, 'sit': datos.situacion, 'inv': datos.inventario}
+    archivos = {tipo: {} for tipo in TIPOS_ARCHIVO}
+    for k, a in enumerate(AGENCIAS):
+        for tipo, generar in generadores.items():
+            archivos[tipo][a['nombre']] = (f"{tipo}_{a['corto'].lower()}.xlsx", generar(nps, semilla=semilla + k))
+    return archivos
+
+def abrir(archivos):
+    # Objetos nuevos en cada corrida, como los que entrega Streamlit
+    return {tipo: {nombre: datos.archivo(*par) for nombre, par in por_agencia.items()} for tipo, por_agencia in archivos.items()}
+
+def correr(archivos, drive, rapido=True):
+    limpiar_cache_cargas()
+    perf.iniciar_corrida()
+    inicio = time.perf_counter()
+    buffer, hojas, _ = generar_reporte(AGENCIAS, abrir(archivos), 'drive', rapido=rapido)
+    link = subir_excel_a_drive(buffer, nombre_reporte())
+    total = time.perf_counter() - inicio
+    eventos = perf.terminar_corrida()
+    assert link and hojas, "La corrida no generó el reporte"
+    etapas = {fila['etapa']: round(fila['segundos'], 3) for fila in perf.resumen(eventos)}
+    return {'total_s': round(total, 3), 'pico_rss_mb': perf.pico_rss_mb(), 'etapas': etapas,
+            'filas': {n: len(df) for n, df in hojas.items()}, 'bytes_excel': buffer.getbuffer().nbytes}
+
+def medir(partes, filas_por_parte, rapido=True):
+    nps = datos.numeros_parte(partes)
+    t = time.perf_counter()
+    archivos = generar_archivos(nps)
+    drive, salida, ventas = preparar_drive(nps, filas_por_parte)
+    print(f"  datos sintéticos generados en {time.perf_counter() - t:.1f} s")
+
+    cache = tempfile.mkdtemp(prefix="compradia_bench_")
+    CONFIG.update({'cache_dir': cache, 'drive_folder_id': salida, 'master_sales_id': ventas,
+                   'gcp_service_account': {'falso': True}})
+    fijar_servicio_drive(drive)
+    try:
+        resultado = {'frio': correr(archivos, drive, rapido), 'caliente': correr(archivos, drive, rapido)}
+        resultado['llamadas_drive'] = dict(drive.llamadas)
+        return resultado
+    finally:
+        fijar_servicio_drive(None)
+        shutil.rmtree(cache, ignore_errors=True)
+
+def comparar(actual, base):
+    regresiones = []
+    for escala, res in actual.items():
+        if escala not in base: continue
+        for modo in ('frio', 'caliente'):
+            previo, nuevo = base[escala][modo], res[modo]
+            for etapa, seg in [('TOTAL', nuevo['total_s'])] + list(nuevo['etapas'].items()):
+                ref = previo['total_s'] if etapa == 'TOTAL' else previo['etapas'].get(etapa)
+                if not ref: continue
+                marca = "  <-- REGRESIÓN" if seg > ref * TOLERANCIA and seg - ref > 0.05 else ""
+                if marca: regresiones.append((escala, modo, etapa))
+                print(f"  {escala:>8} {modo:<9} {etapa:<20} {ref:8.2f} s -> {seg:8.2f} s ({seg / ref:5.2f}x){marca}")
+    return regresiones
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--partes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--filas-por-parte", type=float, default=1.0, help="Filas de MASTER por parte y por año")
+    parser.add_argument("--excel-clasico", action="store_true")
+    parser.add_argument("--guardar-base", action="store_true")
+    parser.add_argument("--comparar", action="store_true")
+    args = parser.parse_args()
+
+    resultados = {}
+    for partes in args.partes:
+        print(f"== {partes:,} partes ==")
+        res = medir(partes, args.filas_por_parte, rapido=not args.excel_clasico)
+        for modo in ('frio', 'caliente'):
+            print(f"  {modo:<9} total {res[modo]['total_s']:8.2f} s | pico RSS {res[modo]['pico_rss_mb']} MB")
+            for etapa, seg in res[modo]['etapas'].items(): print(f"    {etapa:<20} {seg:8.2f} s")
+        resultados[str(partes)] = res
+
+    if args.comparar and os.path.exists(RUTA_BASE):
+        with open(RUTA_BASE, encoding='utf-8') as f: base = json.load(f)
+        print("== Comparación contra la base ==")
+        regresiones = comparar(resultados, base['resultados'])
+        if regresiones: raise SystemExit(f"{len(regresiones)} etapa(s) más lentas que la base")
+
+    if args.guardar_base:
+        base = {'fecha': datetime.date.today().isoformat(), 'python': platform.python_version(), 'maquina': platform.machine(),
+                'cpus': os.cpu_count(), 'filas_por_parte': args.filas_por_parte, 'resultados': resultados}
+        if os.path.exists(RUTA_BASE):
+            with open(RUTA_BASE, encoding='utf-8') as f: previa = json.load(f)
+            base['resultados'] = {**previa.get('resultados', {}), **resultados}
+        with open(RUTA_BASE, 'w', encoding='utf-8') as f: json.dump(base, f, indent=2, ensure_ascii=False)
+        print(f"Base guardada en {RUTA_BASE}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# Generadores de archivos de entrada sintéticos con la misma forma que los reales.
+# Se escriben con xlsxwriter en constant_memory para poder generar 1M de partes en un tiempo razonable.
+import io
+import datetime
+import numpy as np
+import xlsxwriter
+
+MESES = ['ENERO', 'FEBRERO', 'MARZO', 'ABRIL', 'MAYO', 'JUNIO', 'JULIO', 'AGOSTO', 'SEPTIEMBRE', 'OCTUBRE', 'NOVIEMBRE', 'DICIEMBRE']
+COLS_SUGERIDO = ["N° PARTE", "SUGERIDO DIA", "Line Value", "Cycle Count", "Status", "Ship Multiple", "Last 12 Month Demand",
+                 "Current Month Demand", "Job Quantity", "Full Bin", "Bin Location", "Dealer On Hand", "Stock on Order",
+                 "Stock On Back Order", "Reason Code"]
+
+def numeros_parte(partes, semilla=0):
+    # Mezcla de números de parte numéricos con ceros a la izquierda y alfanuméricos
+    rng = np.random.default_rng(semilla)
+    prefijos = rng.choice(np.array(['', '', '', 'AB', 'CR', 'X'], dtype=object), partes)
+    return np.array([f"{p}{i:07d}" for p, i in zip(prefijos, range(partes))], dtype=object)
+
+def _libro(filas, encabezado=None, titulo=None):
+    buffer = io.BytesIO()
+    libro = xlsxwriter.Workbook(buffer, {'constant_memory': True, 'strings_to_numbers': False})
+    hoja = libro.add_worksheet("Hoja1")
+    r = 0
+    for linea in titulo or []:
+        hoja.write_row(r, 0, linea)
+        r += 1
+    if encabezado:
+        hoja.write_row(r, 0, encabezado)
+        r += 1
+    for fila in filas:
+        hoja.write_row(r, 0, fila)
+        r += 1
+    libro.close()
+    return buffer.getvalue()
+
+def sugerido(nps, semilla=0):
+    rng = np.random.default_rng(semilla)
+    n = len(nps)
+    demanda = rng.integers(0, 240, n)
+    sug = rng.integers(0, 30, n)
+    estatus = rng.choice(np.array(['A', 'B', 'C', 'N'], dtype=object), n)
+    filas = ([np_, int(s), round(float(v), 2), 0, e, 1, int(d), int(d // 12), 0, 10, f"R{i % 90:02d}", int(s // 2), 0, 0, "RC"]
+             for i, (np_, s, v, e, d) in enumerate(zip(nps, sug, rng.random(n) * 500, estatus, demanda)))
+    return _libro(filas, COLS_SUGERIDO)
+
+def transito(nps, fraccion=0.2, semilla=0):
+    rng = np.random.default_rng(semilla)
+    elegidos = rng.choice(nps, max(1, int(len(nps) * fraccion)))
+    filas = ([np_, int(c)] for np_, c in zip(elegidos, rng.integers(1, 20, len(elegidos))))
+    return _libro(filas, ["N° PARTE", "TRANSITO"])
+
+def situacion(nps, fraccion=0.3, semilla=0):
+    # Columna 0 = tipo de movimiento (TRASUCTU / TRASUCCU / otros), 2 = N° PARTE, 4 = cantidad (negativa en salidas)
+    rng = np.random.default_rng(semilla)
+    n = max(1, int(len(nps) * fraccion))
+    tipos = rng.choice(np.array(['TRASUCTU', 'TRASUCCU', 'VTAMOS', 'DEVPRO'], dtype=object), n)
+    filas = ([t, f"F{i:07d}", np_, "PZA", -int(c), "2026-01-15"]
+             for i, (t, np_, c) in enumerate(zip(tipos, rng.choice(nps, n), rng.integers(1, 10, n))))
+    return _libro(filas, ["TIPO", "FOLIO", "N° PARTE", "UM", "CANTIDAD", "FECHA"], titulo=[["SITUACION DE TRASPASOS"], []])
+
+def inventario(nps, semilla=0):
+    # Posicional: 0 N° PARTE, 1 DESCR, 2 CLASIF, 4 PRECIO, 8 EXIST, 9 FEC INGRESO (vacía = fila que se descarta), 10 y 11 fechas
+    rng = np.random.default_rng(semilla)
+    n = len(nps)
+    exist = rng.integers(0, 80, n)
+    precio = rng.random(n) * 900
+    sin_ingreso = rng.random(n) < 0.05
+    base = datetime.date(2020, 1, 1)
+    dias = rng.integers(0, 2000, (n, 3))
+    def filas():
+        for i in range(n):
+            ingreso = "" if sin_ingreso[i] else str(base + datetime.timedelta(days=int(dias[i, 0])))
+            yield [nps[i], "DESCRIPCION", "A", "", round(float(precio[i]), 2), "", "", "", int(exist[i]), ingreso,
+                   str(base + datetime.timedelta(days=int(dias[i, 1]))), str(base + datetime.timedelta(days=int(dias[i, 2])))]
+    return _libro(filas(), titulo=[["INVENTARIO"], ["SUCURSAL", "", "", "", "", "", "", "", "", "", "", ""]])
+
+def master_ventas(nps, anio, filas_por_parte=1.0, semilla=0):
+    # Un MASTER anual: AÑO, MES (texto), NP, CANTIDAD (con devoluciones negativas) y columnas que no se usan
+    rng = np.random.default_rng(semilla)
+    n = max(1, int(len(nps) * filas_por_parte))
+    partes = rng.choice(nps, n)
+    meses = rng.integers(0, 12, n)
+    cantidades = rng.integers(-1, 12, n)
+    filas = ([anio, MESES[m], np_, int(c), "SUC", "DESCRIPCION", round(float(c) * 10.5, 2)]
+             for np_, m, c in zip(partes, meses, cantidades))
+    return _libro(filas, ["AÑO", "MES", "NP", "CANTIDAD", "SUCURSAL", "DESCRIPCION", "IMPORTE"])
+
+def archivo(nombre, contenido):
+    # Igual que un archivo subido a Streamlit: bytes en memoria con .name
+    f = io.BytesIO(contenido)
+    f.name = nombre
+    return f
@@ -0,0 +1,169 @@
+# Drive local en memoria: implementa solo lo que usa compradia.drive de drive_service.files()
+# (list con q/pageSize/pageToken, get, get_media descargable con MediaIoBaseDownload, create con o sin media).
+# Las subidas reanudables hablan el protocolo real (POST de sesión, PUT por trozos con 308 + Range, consulta de
+# estado "bytes */total") detrás de un HttpRequest de googleapiclient, así que se ejercita su next_chunk.
+# Con fallar_subidas(n) los siguientes n PUT se cortan a la mitad del trozo o responden 503; abrir una subida a
+# una carpeta que no existe responde 404, como Drive.
+# Se instala con compradia.drive.fijar_servicio_drive(DriveFalso()).
+import re
+import json
+import hashlib
+import threading
+import itertools
+import httplib2
+
+CARPETA = 'application/vnd.google-apps.folder'
+_CADENA = r"'((?:[^'\\]|\\.)*)'"
+
+def _literal(texto):
+    return re.sub(r"\\(.)", r"\1", texto)
+
+def _traducir_query(q):
+    # Gramática de Drive v3 usada por la app -> expresión Python sobre el dict del archivo `f`
+    reglas = [
+        (rf"name contains {_CADENA}", lambda m: f"({_literal(m.group(1))!r} in f['name'])"),
+        (rf"name\s*=\s*{_CADENA}", lambda m: f"(f['name'] == {_literal(m.group(1))!r})"),
+        (rf"mimeType\s*=\s*{_CADENA}", lambda m: f"(f.get('mimeType') == {_literal(m.group(1))!r})"),
+        (rf"{_CADENA} in parents", lambda m: f"({_literal(m.group(1))!r} in f.get('parents', []))"),
+        (r"trashed\s*=\s*false", lambda m: "(not f.get('trashed'))"),
+    ]
+    patron = "|".join(f"(?:{regla})" for regla, _ in reglas)
+    partes, pos = [], 0
+    for m in re.finditer(patron, q):
+        resto = q[pos:m.start()]
+        if resto.strip(" ()andor"): raise ValueError(f"Consulta no soportada: {resto!r}")
+        partes.append(resto)
+        for regla, traducir in reglas:
+            sub = re.fullmatch(regla, m.group(0))
+            if sub:
+                partes.append(traducir(sub))
+                break
+        pos = m.end()
+    partes.append(q[pos:])
+    return compile("".join(partes), "<q>", "eval")
+
+class _Peticion:
+    def __init__(self, funcion): self._funcion = funcion
+    def execute(self, num_retries=0): return self._funcion()
+
+class _HttpFalso:
+    # Responde los GET por rangos que hace MediaIoBaseDownload
+    def __init__(self, contenido): self.contenido = contenido
+    def request(self, uri, method="GET", headers=None, **kwargs):
+        total = len(self.contenido)
+        inicio, fin = (int(x) for x in re.match(r"bytes=(\d+)-(\d+)", headers["range"]).groups())
+        trozo = self.contenido[inicio:fin + 1]
+        rango = f"bytes {inicio}-{inicio + len(trozo) - 1}/{total}" if total else "bytes */0"
+        return httplib2.Response({'status': 206 if total else 416, 'content-range': rango}), trozo
+
+class _PeticionMedia:
+    def __init__(self, drive, file_id):
+        self.uri = f"falso://drive/{file_id}"
+        self.headers = {}
+        self.http = _HttpFalso(drive.contenido(file_id))
+
+class _HttpSubidaFalso:
+    # Servidor de subidas reanudables: guarda lo recibido por sesión y responde como Drive
+    def __init__(self, drive, metadata):
+        self.drive, self.metadata = drive, metadata
+        self.sesiones = {}
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        if method == "POST":
+            if any(self.drive.archivos.get(p, {}).get('mimeType') != CARPETA for p in self.metadata.get('parents', [])):
+                return httplib2.Response({'status': 404}), b'{"error": {"code": 404, "message": "File not found"}}'
+            sesion = f"falso://subida/{len(self.sesiones) + 1}"
+            self.sesiones[sesion] = bytearray()
+            return httplib2.Response({'status': 200, 'location': sesion}), b""
+        recibido = self.sesiones[uri]
+        inicio, fin, total = re.match(r"bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)", headers["content-range"]).groups()
+        if inicio is not None:
+            self.drive.contar('put')
+            datos = body.read() if hasattr(body, 'read') else bytes(body)
+            falla = self.drive.siguiente_falla()
+            if falla == 'corte':
+                # Llega la mitad del trozo y se cae la conexión
+                recibido[int(inicio):] = datos[:len(datos) // 2]
+                raise ConnectionResetError("Conexión interrumpida (simulada)")
+            if falla == '503': return httplib2.Response({'status': 503}), b"{}"
+            recibido[int(inicio):] = datos
+        if total != "*" and len(recibido) == int(total):
+            meta = self.drive.agregar(self.metadata['name'], bytes(recibido), self.metadata.get('parents', []), self.metadata.get('mimeType'))
+            return httplib2.Response({'status': 200}), json.dumps(meta).encode()
+        respuesta = {'status': 308}
+        if recibido: respuesta['range'] = f"bytes=0-{len(recibido) - 1}"
+        return httplib2.Response(respuesta), b""
+
+class _Archivos:
+    def __init__(self, drive): self.drive = drive
+
+    def list(self, q="", fields=None, pageSize=100, pageToken=None, **kwargs):
+        def ejecutar():
+            self.drive.contar('list')
+            filtro = _traducir_query(q)
+            encontrados = [dict(f) for f in self.drive.archivos.values() if eval(filtro, {}, {'f': f})]
+            inicio = int(pageToken or 0)
+            pagina = encontrados[inicio:inicio + pageSize]
+            respuesta = {'files': pagina}
+            if inicio + pageSize < len(encontrados): respuesta['nextPageToken'] = str(inicio + pageSize)
+            return respuesta
+        return _Peticion(ejecutar)
+
+    def get(self, fileId, fields=None, **kwargs):
+        def ejecutar():
+            self.drive.contar('get')
+            if fileId not in self.drive.archivos:
+                from googleapiclient.errors import HttpError
+                raise HttpError(httplib2.Response({'status': 404}), b"{}")
+            return dict(self.drive.archivos[fileId])
+        return _Peticion(ejecutar)
+
+    def get_media(self, fileId, **kwargs):
+        self.drive.contar('get_media')
+        return _PeticionMedia(self.drive, fileId)
+
+    def create(self, body=None, media_body=None, fields=None, **kwargs):
+        if media_body is not None and media_body.resumable():
+            from googleapiclient.http import HttpRequest
+            self.drive.contar('create')
+            return HttpRequest(_HttpSubidaFalso(self.drive, body), lambda resp, contenido: json.loads(contenido),
+                               "falso://subida", method="POST", body=json.dumps(body), headers={}, resumable=media_body)
+        def ejecutar():
+            self.drive.contar('create')
+            contenido = media_body.getbytes(0, media_body.size()) if media_body is not None else b""
+            return self.drive.agregar(body['name'], contenido, body.get('parents', []), body.get('mimeType'))
+        return _Peticion(ejecutar)
+
+class DriveFalso:
+    def __init__(self):
+        self.archivos = {}
+        self._contenidos = {}
+        self.llamadas = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._fallas = []
+
+    def files(self): return _Archivos(self)
+
+    def contar(self, metodo):
+        with self._lock: self.llamadas[metodo] = self.llamadas.get(metodo, 0) + 1
+
+    def agregar(self, nombre, contenido=b"", parents=(), mime_type=None):
+        with self._lock:
+            file_id = f"f{next(self._ids):06d}"
+            meta = {'id': file_id, 'name': nombre, 'parents': list(parents), 'webViewLink': f"https://drive.falso/{file_id}",
+                    'modifiedTime': "2026-01-01T00:00:00.000Z"}
+            if mime_type: meta['mimeType'] = mime_type
+            else: meta['md5Checksum'] = hashlib.md5(contenido).hexdigest()
+            self.archivos[file_id] = meta
+            self._contenidos[file_id] = contenido
+        return dict(meta)
+
+    def contenido(self, file_id): return self._contenidos[file_id]
+
+    def fallar_subidas(self, n, modo='corte'):
+        with self._lock: self._fallas.extend([modo] * n)
+
+    def siguiente_falla(self):
+        with self._lock: return self._fallas.pop(0) if self._fallas else None
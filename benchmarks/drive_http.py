@@ -0,0 +1,113 @@
+# Drive HTTP local: sirve un DriveFalso por HTTP/1.1 en 127.0.0.1 con las rutas de Drive v3 que usa la app
+# (files.list, files.get, alt=media con Range, /batch/drive/v3), para probar compradia.drive_async y el cliente
+# síncrono de googleapiclient sin red. latencia = segundos que tarda cada respuesta (simula la ida y vuelta).
+# Uso:
+#   servidor = DriveHTTP(drive, latencia=0.02).iniciar()
+#   CONFIG['drive_url'] = servidor.url
+#   ...
+#   servidor.detener()
+import re
+import json
+import time
+import uuid
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from benchmarks.drive_falso import _traducir_query
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1 # Cabeceras y cuerpo salen juntos: sin la espera de Nagle + ACK retrasado entre los dos
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args): pass
+
+    def _responder(self, estado, cuerpo=b"", tipo="application/json", extra=None):
+        if isinstance(cuerpo, (dict, list)): cuerpo = json.dumps(cuerpo).encode()
+        self.send_response(estado)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        for clave, valor in (extra or {}).items(): self.send_header(clave, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        servidor = self.server.drive_http
+        servidor.contar(self.command)
+        if servidor.latencia: time.sleep(servidor.latencia)
+        estado, cuerpo, tipo, extra = servidor.resolver_get(self.path, self.headers.get("Range"))
+        self._responder(estado, cuerpo, tipo, extra)
+
+    def do_POST(self):
+        servidor = self.server.drive_http
+        servidor.contar(self.command)
+        if servidor.latencia: time.sleep(servidor.latencia)
+        contenido = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if urlsplit(self.path).path != "/batch/drive/v3": return self._responder(404, {'error': 'ruta'})
+        frontera = f"respuesta_{uuid.uuid4().hex}"
+        cuerpo = servidor.resolver_lote(self.headers["Content-Type"], contenido, frontera)
+        self._responder(200, cuerpo, f"multipart/mixed; boundary={frontera}")
+
+class DriveHTTP:
+    def __init__(self, drive, latencia=0.0):
+        self.drive, self.latencia = drive, latencia
+        self.peticiones = {}
+        self._lock = threading.Lock()
+        self._servidor = None
+
+    def contar(self, metodo):
+        with self._lock: self.peticiones[metodo] = self.peticiones.get(metodo, 0) + 1
+
+    @property
+    def url(self):
+        host, puerto = self._servidor.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    def iniciar(self):
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Manejador)
+        self._servidor.daemon_threads = True
+        self._servidor.drive_http = self
+        threading.Thread(target=self._servidor.serve_forever, name="drive-http", daemon=True).start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def resolver_get(self, ruta, rango=None):
+        # -> (estado, cuerpo, content-type, cabeceras extra)
+        partes = urlsplit(ruta)
+        params = {k: v[0] for k, v in parse_qs(partes.query).items()}
+        if partes.path == "/drive/v3/files":
+            filtro = _traducir_query(params.get('q', ""))
+            encontrados = [dict(f) for f in self.drive.archivos.values() if eval(filtro, {}, {'f': f})]
+            inicio, tamano = int(params.get('pageToken') or 0), int(params.get('pageSize', 100))
+            respuesta = {'files': encontrados[inicio:inicio + tamano]}
+            if inicio + tamano < len(encontrados): respuesta['nextPageToken'] = str(inicio + tamano)
+            return 200, respuesta, "application/json", None
+        m = re.fullmatch(r"/drive/v3/files/([^/]+)", partes.path)
+        if not m or unquote(m.group(1)) not in self.drive.archivos: return 404, {'error': {'code': 404}}, "application/json", None
+        file_id = unquote(m.group(1))
+        if params.get('alt') != 'media': return 200, dict(self.drive.archivos[file_id]), "application/json", None
+        contenido = self.drive.contenido(file_id)
+        rango = re.fullmatch(r"bytes=(\d+)-(\d*)", rango or "")
+        if not rango: return 200, contenido, "application/octet-stream", None
+        inicio = int(rango.group(1))
+        fin = min(int(rango.group(2) or len(contenido) - 1), len(contenido) - 1)
+        return 206, contenido[inicio:fin + 1], "application/octet-stream", {'Content-Range': f"bytes {inicio}-{fin}/{len(contenido)}"}
+
+    def resolver_lote(self, content_type, contenido, frontera):
+        # Cada parte del lote es un GET completo; la respuesta repite su Content-ID como <response-k>
+        entrada = content_type.split("boundary=", 1)[1].strip().strip('"')
+        salida = []
+        for parte in contenido.split(b"--" + entrada.encode())[1:]:
+            if parte.startswith(b"--"): break
+            cabeceras, _, http = parte.strip(b"\r\n").partition(b"\r\n\r\n")
+            content_id = re.search(rb"Content-ID:\s*<([^>]*)>", cabeceras, re.I).group(1).decode()
+            ruta = http.split(b"\r\n", 1)[0].split(b" ")[1].decode()
+            estado, cuerpo, tipo, _ = self.resolver_get(ruta)
+            cuerpo = json.dumps(cuerpo) if isinstance(cuerpo, (dict, list)) else cuerpo.decode()
+            salida.append(f"--{frontera}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                          f"HTTP/1.1 {estado} {'OK' if estado == 200 else 'Not Found'}\r\nContent-Type: {tipo}\r\n\r\n"
+                          f"{cuerpo}\r\n")
+        return ("".join(salida) + f"--{frontera}--\r\n").encode()
@@ -0,0 +1,180 @@
+# Pruebas de equivalencia de los caminos rápidos contra su referencia (sin red). Termina con error si algo difiere.
+#   - compradia.lectura.leer_excel_proyectado contra pd.read_excel(header=None) en .xlsx y .xls desordenados:
+#     copia la inferencia de tipos de pandas con funciones privadas (pandas._libs.parsers, TextParser), así que
+#     hay que correrla al cambiar de versión de pandas.
+#   - Modo delta (compradia.delta) contra la hoja completa, celda por celda, a lo largo de varias corridas.
+#   - HITS/PROMEDIO a varios horizontes en una pasada (compradia.indice) contra resumir_ventana en cada ventana.
+# Uso: python -m benchmarks.equivalencias [--hojas 150] [--partes 3000]   (los .xls necesitan xlwt: pip install xlwt)
+import argparse
+import datetime
+import io
+import random
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from benchmarks import bench_historico, bench_pipeline, datos
+from compradia.config import CONFIG, AGENCIAS
+from compradia.delta import construir_hojas_delta
+from compradia.indice import construir_indice, resumen_indice
+from compradia.lectura import leer_excel_proyectado
+from compradia.motor import construir_hojas
+from compradia.reporte import cargar_entradas
+from compradia.ventas import agregar_mensual, inicio_horizonte, periodos_ventana, resumir_ventana
+
+# --- LECTOR PROYECTADO ---
+
+FECHA = datetime.datetime(2025, 3, 14)
+# Valores que cambian el dtype que infiere pandas: enteros, decimales, texto numérico con ceros a la izquierda,
+# textos que pandas lee como NA, fechas, booleanos, errores de Excel y celdas vacías
+VALORES = {
+    'entero': lambda r: r.randint(-50, 5000),
+    'decimal': lambda r: round(r.uniform(-10, 900), 2),
+    'texto': lambda r: r.choice(["A", "PZA", "TRASUCTU", "TRASUCCU", "sin dato"]),
+    'texto_numerico': lambda r: f"{r.randint(0, 999):05d}",
+    'na_texto': lambda r: r.choice(["NA", "N/A", "NULL", "nan", "#N/A"]),
+    'fecha': lambda r: FECHA + datetime.timedelta(days=r.randint(0, 900)),
+    'booleano': lambda r: r.random() < 0.5,
+    'error': lambda r: "#DIV/0!",
+    'vacio': lambda r: None,
+}
+COLUMNAS = 10
+
+def filas_desordenadas(semilla, xls=False):
+    # Cada columna mezcla pocos tipos (como una exportación real) y algunas filas raras; al final, filas vacías
+    r = random.Random(semilla)
+    tipos = [t for t in VALORES if not (xls and t == 'error')]
+    paletas = [r.sample(tipos, r.randint(1, 3)) for _ in range(COLUMNAS)]
+    filas = []
+    for _ in range(r.randint(5, 60)):
+        fila = [VALORES[r.choice(paleta) if r.random() < 0.9 else r.choice(tipos)](r) for paleta in paletas]
+        fila[0] = r.choice(["TRASUCTU", "TRASUCCU", "VTAMOS", None, 7])
+        filas.append(fila)
+    filas += [[None] * COLUMNAS for _ in range(r.randint(0, 3))]
+    return filas
+
+def libro_xlsx(filas):
+    import openpyxl
+    libro = openpyxl.Workbook()
+    hoja = libro.active
+    for r, fila in enumerate(filas, start=1):
+        for c, valor in enumerate(fila, start=1):
+            celda = hoja.cell(r, c)
+            if valor is None:
+                if r > 2 and c == 1: celda.number_format = '0.00' # Celda con formato y sin valor (filas "vacías" que openpyxl sí entrega)
+                continue
+            celda.value = valor
+            if valor == "#DIV/0!": celda.data_type = 'e'
+    buffer = io.BytesIO()
+    libro.save(buffer)
+    return buffer.getvalue()
+
+def libro_xls(filas):
+    import xlwt
+    libro = xlwt.Workbook()
+    hoja = libro.add_sheet("Hoja1")
+    estilo_fecha = xlwt.easyxf(num_format_str='YYYY-MM-DD')
+    for r, fila in enumerate(filas):
+        for c, valor in enumerate(fila):
+            if valor is None: continue
+            if isinstance(valor, datetime.datetime): hoja.write(r, c, valor, estilo_fecha)
+            else: hoja.write(r, c, valor)
+    buffer = io.BytesIO()
+    libro.save(buffer)
+    return buffer.getvalue()
+
+# Mismos filtros que compradia.entradas: inventario (fecha de ingreso no vacía) y situación (tipo de traspaso)
+FILTROS = [
+    ([0, 1, 2, 4, 8, 9], (9, lambda v: v != "")),
+    ([0, 2, 4], (0, lambda v: isinstance(v, str) and v.strip() == "TRASUCTU")),
+    ([3, 5, 6, 7], None),
+]
+
+def comprobar_lector(hojas):
+    try: import xlwt # noqa: F401
+    except ImportError: xlwt = None
+    formatos = [('xlsx', 'openpyxl', libro_xlsx)] + ([('xls', 'xlrd', libro_xls)] if xlwt else [])
+    casos = 0
+    for semilla in range(hojas):
+        for extension, engine, escribir in formatos:
+            contenido = escribir(filas_desordenadas(semilla, xls=extension == 'xls'))
+            completo = pd.read_excel(io.BytesIO(contenido), header=None, engine=engine)
+            for columnas, filtro in FILTROS:
+                archivo = datos.archivo(f"prueba.{extension}", contenido)
+                proyectado = leer_excel_proyectado(archivo, columnas, filtro=filtro, engine=engine)
+                esperado = completo[columnas]
+                if filtro is not None:
+                    # El filtro ve las celdas como las entrega el lector ("" = vacía), no como NaN
+                    crudo = pd.read_excel(io.BytesIO(contenido), header=None, engine=engine, dtype=object, na_filter=False)
+                    esperado = esperado[[filtro[1](v) for v in crudo[filtro[0]]]]
+                try: pd.testing.assert_frame_equal(proyectado, esperado)
+                except AssertionError as e: raise AssertionError(f"Lector proyectado: hoja {semilla} .{extension} columnas {columnas}\n{e}")
+                casos += 1
+    print(f"Lector proyectado: {casos} casos idénticos a pd.read_excel (pandas {pd.__version__})"
+          + ("" if xlwt else " — .xls omitido: falta xlwt"))
+
+# --- MODO DELTA Y HORIZONTES ---
+
+def bi_sintetico(partes, hoy, horizontes=()):
+    nps = [f"{i:07d}" for i in range(partes)]
+    por_agencia = {}
+    for k, a in enumerate(AGENCIAS):
+        historico = bench_historico.historico_sintetico(partes * 4, partes, semilla=k)
+        historico['NP'] = historico['NP'].map(lambda n: nps[int(n) % partes] if isinstance(n, str) and n.strip().isdigit() else n)
+        p_inicio, p_fin = periodos_ventana(12, hoy)
+        indice = construir_indice(agregar_mensual(historico), p_inicio, p_fin, horizontes=horizontes)
+        por_agencia[a['nombre']] = resumen_indice(indice, horizontes)
+    return np.array(nps, dtype=object), por_agencia
+
+def comprobar_horizontes(partes, hoy):
+    historico = bench_historico.historico_sintetico(partes * 6, partes)
+    historico.loc[historico.index % 17 == 0, 'MES'] = "MES RARO" # Mes 0
+    agregado = agregar_mensual(historico)
+    p_inicio, p_fin = periodos_ventana(12, hoy)
+    horizontes = (1, 3, 6, 9, 18, 24)
+    indice = construir_indice(agregado, p_inicio, p_fin, horizontes=horizontes)
+    for h in (12, *horizontes):
+        esperado = resumir_ventana(agregado, inicio_horizonte(p_fin, h), p_fin, meses=h)
+        hits, promedio, con_ventas = (indice['hits'], indice['promedio'], indice['en_ventana']) if h == 12 else indice['horizontes'][h]
+        obtenido = pd.DataFrame({'NP': indice['nps'][con_ventas].astype(object), 'HITS_CALCULADO': hits[con_ventas],
+                                 'PROMEDIO_CALCULADO': promedio[con_ventas]})
+        esperado = esperado[['NP', 'HITS_CALCULADO', 'PROMEDIO_CALCULADO']].sort_values('NP', ignore_index=True)
+        try: pd.testing.assert_frame_equal(obtenido, esperado, check_dtype=False)
+        except AssertionError as e: raise AssertionError(f"Horizonte {h} meses\n{e}")
+    print(f"Horizontes {(12, *horizontes)}: idénticos a resumir_ventana en cada ventana ({len(indice['nps']):,} partes)")
+
+def comprobar_delta(partes, hoy):
+    nps, bi = bi_sintetico(partes, hoy)
+    _, bi_horizontes = bi_sintetico(partes, hoy, horizontes=(3, 6))
+    archivos = bench_pipeline.generar_archivos(nps)
+    nuevo_transito = {**archivos, 'trans': {**archivos['trans'], AGENCIAS[0]['nombre']: ("trans.xlsx", datos.transito(nps, semilla=7))}}
+    menos_partes = {**nuevo_transito, 'sug': {**archivos['sug'], AGENCIAS[1]['nombre']: ("sug.xlsx", datos.sugerido(nps[partes // 10:], semilla=1))}}
+    corridas = [("primera corrida", archivos, bi), ("misma entrada", archivos, bi), ("tránsito nuevo", nuevo_transito, bi),
+                ("sugerido con menos partes", menos_partes, bi), ("horizontes 3 y 6", menos_partes, bi_horizontes)]
+    for nombre, entrada, bi_corrida in corridas:
+        entradas = cargar_entradas(AGENCIAS, bench_pipeline.abrir(entrada), bi_corrida)
+        completas = construir_hojas(AGENCIAS, entradas)
+        hojas, _, recalculadas = construir_hojas_delta(AGENCIAS, entradas)
+        for agencia, hoja in hojas.items():
+            try: pd.testing.assert_frame_equal(hoja, completas[agencia], check_dtype=False)
+            except AssertionError as e: raise AssertionError(f"Modo delta, {nombre}, {agencia}\n{e}")
+        if nombre == "misma entrada": assert not any(recalculadas.values()), f"Modo delta: {recalculadas} filas recalculadas sin cambios"
+        print(f"Modo delta, {nombre}: igual a la hoja completa (filas recalculadas {recalculadas})")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hojas", type=int, default=150, help="Libros desordenados para el lector proyectado")
+    parser.add_argument("--partes", type=int, default=3000, help="Partes para el modo delta y los horizontes")
+    args = parser.parse_args()
+    hoy = datetime.datetime(2026, 2, 15)
+
+    comprobar_lector(args.hojas)
+    comprobar_horizontes(args.partes, hoy)
+    cache = tempfile.mkdtemp(prefix="compradia_equivalencias_")
+    CONFIG['cache_dir'] = cache
+    try: comprobar_delta(args.partes, hoy)
+    finally: shutil.rmtree(cache, ignore_errors=True)
+    print("Todo idéntico ✔")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Ejecución sin Streamlit, p.ej. desde cron:
+#   python -m compradia run --sug-cuauti S1.xlsx --sug-tulti S2.xlsx --inv-cuauti I1.xls --inv-tulti I2.xls --out reporte.xlsx
+# Opciones por agencia (sufijo = nombre corto en minúsculas): --sug-, --inv- (obligatorias), --trans-, --sit-.
+import argparse
+import io
+import os
+import sys
+import time
+from compradia.config import CONFIG, leer_secretos, configurar_desde_secretos, agencias, ruta_log_rendimiento
+
+AYUDAS = {'sug': "Sugerido", 'trans': "Tránsito", 'sit': "Situación de traspasos", 'inv': "Inventario"}
+
+def abrir_archivo(ruta):
+    # Mismo tipo de objeto que un archivo subido a Streamlit: bytes en memoria con .name
+    with open(ruta, 'rb') as f: archivo = io.BytesIO(f.read())
+    archivo.name = ruta
+    return archivo
+
+def crear_parser(lista_agencias):
+    parser = argparse.ArgumentParser(prog="python -m compradia", description="CRA INT - Compras Día")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    run = sub.add_parser("run", help="Genera el reporte DIA sin interfaz")
+    for tipo, ayuda in AYUDAS.items():
+        for a in lista_agencias:
+            run.add_argument(f"--{tipo}-{a['corto'].lower()}", dest=f"{tipo}__{a['nombre']}", metavar="ARCHIVO", help=f"{ayuda} {a['etiqueta']}")
+    run.add_argument("--out", help="Ruta del Excel de salida (por defecto el nombre estándar en la carpeta actual)")
+    run.add_argument("--secrets", help="Archivo de secretos (por defecto .streamlit/secrets.toml o $COMPRADIA_SECRETS)")
+    run.add_argument("--historico", choices=["drive", "cache", "no"], default="drive",
+                     help="drive = consulta Drive y usa la caché; cache = solo la caché local, sin conexión; no = sin histórico")
+    run.add_argument("--subir", action="store_true", help="Sube el Excel a la carpeta de salida en Drive")
+    run.add_argument("--excel-clasico", action="store_true", help="Escritura con pandas.ExcelWriter (más lenta)")
+    run.add_argument("--solo-valores", action="store_true", help="Sin fórmulas, solo valores")
+    run.add_argument("--delta", action="store_true",
+                     help="Solo recalcula las partes cuyas entradas cambiaron desde la última corrida y agrega hojas CAMBIOS")
+    run.add_argument("--delta-reiniciar", action="store_true",
+                     help="Borra el estado guardado del modo delta antes de correr (con --delta todo se recalcula y sale como NUEVO)")
+    run.add_argument("--cambios", metavar="ARCHIVO", help="Con --delta: guarda además un Excel solo con las hojas CAMBIOS")
+    run.add_argument("--horizontes", type=int, nargs="*", metavar="MESES", default=None,
+                     help="Columnas HITS/PROMEDIO extra a estos horizontes en meses, p.ej. --horizontes 3 6 (por omisión [general] horizontes)")
+    run.add_argument("--perfil", action="store_true", help="Imprime el tiempo de cada etapa al terminar")
+    run.add_argument("--memoria-detallada", action="store_true", help="Pico de memoria por etapa con tracemalloc (más lento)")
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Los secretos pueden definir las agencias, y las agencias definen las opciones
+    previo = argparse.ArgumentParser(add_help=False)
+    previo.add_argument("--secrets")
+    conocidos, _ = previo.parse_known_args(argv)
+    try: configurar_desde_secretos(leer_secretos(conocidos.secrets))
+    except ValueError as e:
+        print(f"⚠️ Secretos inválidos: {e}", file=sys.stderr)
+        return 2
+    lista_agencias = agencias()
+    parser = crear_parser(lista_agencias)
+    args = parser.parse_args(argv)
+    if args.horizontes and min(args.horizontes) < 1: parser.error("--horizontes: los meses deben ser 1 o más")
+
+    from compradia.cargas import configurar_cache_cargas
+    from compradia.reporte import TIPOS_ARCHIVO, faltantes, generar_reporte, nombre_reporte
+    configurar_cache_cargas(CONFIG['cache_cargas_mb'])
+    valores = vars(args)
+    archivos = {tipo: {} for tipo in TIPOS_ARCHIVO}
+    for tipo in TIPOS_ARCHIVO:
+        for a in lista_agencias:
+            ruta = valores.get(f"{tipo}__{a['nombre']}")
+            if ruta: archivos[tipo][a['nombre']] = abrir_archivo(ruta)
+    falta = faltantes(lista_agencias, archivos)
+    if falta:
+        print("⚠️ Faltan archivos: " + ", ".join(f"--{tipo}-{a['corto'].lower()}" for tipo, a in falta), file=sys.stderr)
+        return 2
+    from compradia.drive import drive_disponible
+    if args.subir and not drive_disponible():
+        print("⚠️ --subir necesita credenciales de Drive ([gcp_service_account] en los secretos).", file=sys.stderr)
+        return 2
+    historico = None if args.historico == "no" else args.historico
+    if historico == "drive" and not drive_disponible():
+        print("⚠️ Sin credenciales de Drive: se usa solo la caché local del histórico.", file=sys.stderr)
+        historico = "cache"
+
+    if args.delta_reiniciar:
+        from compradia.delta import limpiar_estados_delta
+        limpiar_estados_delta()
+
+    from compradia import perf
+    corrida = perf.iniciar_corrida(memoria_detallada=args.memoria_detallada or CONFIG['perfil_memoria'])
+    inicio = time.perf_counter()
+    progreso = lambda pct, texto: print(f"[{pct:3d}%] {time.perf_counter() - inicio:7.2f} s  {texto}", file=sys.stderr)
+    buffer, hojas, cambios = generar_reporte(lista_agencias, archivos, historico, rapido=not args.excel_clasico,
+                                             solo_valores=args.solo_valores, progreso=progreso, delta=args.delta,
+                                             horizontes=tuple(sorted(set(CONFIG['horizontes'] if args.horizontes is None else args.horizontes))))
+    if buffer is None:
+        print("❌ No se pudo leer algún sugerido.", file=sys.stderr)
+        return 1
+
+    nombre = nombre_reporte()
+    salida = args.out or nombre
+    with open(salida, 'wb') as f: f.write(buffer.getbuffer())
+    print(f"✅ {salida} ({', '.join(f'{n}: {len(df)} filas' for n, df in hojas.items())})", file=sys.stderr)
+    if cambios is not None:
+        print(f"🔁 Cambios: {', '.join(f'{n}: {len(df)} filas' for n, df in cambios.items())}", file=sys.stderr)
+        if args.cambios:
+            from compradia.excel import escribir_cambios
+            with open(args.cambios, 'wb') as f: f.write(escribir_cambios(io.BytesIO(), lista_agencias, cambios).getbuffer())
+    if args.subir:
+        from compradia.drive import subir_excel_a_drive
+        progreso(90, "☁️ Subiendo archivo maestro a Google Drive...")
+        buffer.seek(0)
+        link = subir_excel_a_drive(buffer, os.path.basename(args.out) if args.out else nombre)
+        if link: print(link)
+    total = time.perf_counter() - inicio
+    eventos = perf.terminar_corrida(corrida)
+    perf.guardar_log(eventos, ruta_log_rendimiento(), origen="cli", total_s=round(total, 3), historico=args.historico,
+                     filas={n: len(df) for n, df in hojas.items()})
+    if args.perfil:
+        for fila in perf.resumen(eventos):
+            print(f"  {fila['etapa']:<20} x{fila['veces']:<3} {fila['segundos']:8.2f} s", file=sys.stderr)
+    print(f"⏱️ {total:.2f} s", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
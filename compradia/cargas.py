@@ -0,0 +1,72 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+# Caché en memoria de archivos subidos ya procesados. Vive en el módulo, así que sobrevive a los
+# reruns de Streamlit. Clave = (cargador, hash del contenido, parámetros): si se vuelve a subir el
+# mismo archivo no se parsea de nuevo, y si cambia un solo archivo solo ese se vuelve a leer.
+
+_cache_cargas = OrderedDict() # clave -> (resultado, bytes estimados); el final es lo más reciente
+_bytes_cargas = 0
+_max_bytes_cargas = 256 * 1024 * 1024
+_lock_cargas = threading.Lock()
+
+def configurar_cache_cargas(max_mb):
+    global _max_bytes_cargas
+    with _lock_cargas:
+        _max_bytes_cargas = int(max_mb * 1024 * 1024)
+        _expulsar()
+
+def huella_contenido(contenido):
+    return hashlib.sha256(contenido).hexdigest()
+
+def _clave(cargador, contenido, params):
+    # El bytecode del cargador entra a la clave: si se edita la función no se reusa lo viejo
+    codigo = cargador.__code__
+    version = hashlib.sha1(codigo.co_code + repr(codigo.co_consts).encode()).hexdigest()[:12]
+    return (cargador.__qualname__, version, huella_contenido(contenido), params)
+
+def _tamano(resultado):
+    if isinstance(resultado, pd.DataFrame): return int(resultado.memory_usage(index=True, deep=True).sum())
+    return 0
+
+def _expulsar():
+    global _bytes_cargas
+    # Se conserva siempre la última entrada aunque sola exceda el límite
+    while _bytes_cargas > _max_bytes_cargas and len(_cache_cargas) > 1:
+        _, (_, tamano) = _cache_cargas.popitem(last=False)
+        _bytes_cargas -= tamano
+
+def _copia(resultado):
+    # Copia completa: sin copy-on-write (no viene activo en pandas 2.x) una copia superficial comparte los
+    # arreglos, y un cambio del llamador alteraría lo guardado para la siguiente corrida
+    return resultado.copy(deep=True) if isinstance(resultado, pd.DataFrame) else resultado
+
+def cargar_con_cache(cargador, archivo, *params):
+    global _bytes_cargas
+    if archivo is None: return cargador(archivo, *params)
+    contenido = archivo.getvalue() if hasattr(archivo, 'getvalue') else archivo.read()
+    clave = _clave(cargador, contenido, params)
+    with _lock_cargas:
+        if clave in _cache_cargas:
+            _cache_cargas.move_to_end(clave)
+            return _copia(_cache_cargas[clave][0])
+    if hasattr(archivo, 'seek'): archivo.seek(0)
+    resultado = cargador(archivo, *params)
+    tamano = _tamano(resultado)
+    with _lock_cargas:
+        if clave not in _cache_cargas:
+            _cache_cargas[clave] = (resultado, tamano)
+            _bytes_cargas += tamano
+            _expulsar()
+    return _copia(resultado)
+
+def tamano_cache_cargas():
+    with _lock_cargas: return len(_cache_cargas), _bytes_cargas
+
+def limpiar_cache_cargas():
+    global _bytes_cargas
+    with _lock_cargas:
+        _cache_cargas.clear()
+        _bytes_cargas = 0
@@ -0,0 +1,78 @@
+import os
+
+# --- CONFIGURACIÓN DE AGENCIAS ---
+# Cada agencia genera su hoja "DIA <nombre>" y se cruza con su agencia foránea.
+# Para agregar una sucursal basta con agregar una entrada (o definir [[agencias]] en los secretos).
+AGENCIAS = [
+    {'nombre': 'CUAUTITLAN', 'corto': 'CUAUTI', 'etiqueta': 'Cuauti', 'foranea': 'TULTITLAN',
+     'filtro_traspaso': 'TRASUCTU', 'col_parte': 'N° PARTE', 'col_traspaso': 'TRASPASO TULTI A CUATI'},
+    {'nombre': 'TULTITLAN', 'corto': 'TULTI', 'etiqueta': 'Tulti', 'foranea': 'CUAUTITLAN',
+     'filtro_traspaso': 'TRASUCCU', 'col_parte': 'N° DE PARTE', 'col_traspaso': 'TRASPASO CUAUT A TULTI'},
+]
+
+# Configuración compartida por la app de Streamlit y la línea de comandos.
+# Se llena desde los secretos ([general], [gcp_service_account], [[agencias]]) con configurar_desde_secretos.
+CONFIG = {
+    'drive_folder_id': None,     # Carpeta de salida en Drive
+    'master_sales_id': None,     # Carpeta de los MASTER de ventas
+    'cache_dir': ".cache_compradia",
+    'cache_max_mb': 1024.0,
+    'max_descargas': 4,          # Descargas simultáneas por agencia
+    'cache_cargas_mb': 256.0,    # Archivos subidos ya procesados (memoria)
+    'gcp_service_account': None,
+    'log_rendimiento': None,     # JSON Lines con los tiempos de cada corrida (None = <cache_dir>/rendimiento.jsonl)
+    'perfil_memoria': False,     # Pico de memoria por etapa con tracemalloc (más lento)
+    'chunk_subida_mb': 8.0,      # Tamaño de cada trozo de la subida reanudable (múltiplo de 256 KB)
+    'reintentos_subida': 6,      # Fallas seguidas de red/servidor que se toleran al subir el reporte
+    'espera_reintento_s': 1.0,   # Primera espera del backoff exponencial (se duplica en cada falla seguida)
+    'agencias': None,            # None = AGENCIAS
+    'drive_async': False,        # Listado de MASTER, validación de carpetas y descargas con el cliente asíncrono (compradia.drive_async)
+    'conexiones_drive': 8,       # Conexiones/peticiones simultáneas del cliente asíncrono
+    'reintentos_drive': 5,       # Reintentos del cliente asíncrono ante 429/5xx o fallas de red
+    'drive_url': None,           # Otro servidor compatible con Drive v3 (p.ej. el Drive HTTP local de benchmarks)
+    'horizontes': [],            # Meses de las columnas HITS/PROMEDIO extra que se marcan por omisión, p.ej. [3, 6]
+}
+
+# Horizontes (meses) que se ofrecen para las columnas HITS/PROMEDIO extra; la ventana principal es de 12
+HORIZONTES = [1, 3, 6, 9, 18, 24]
+
+RUTA_SECRETOS = os.path.join(".streamlit", "secrets.toml")
+
+def leer_secretos(ruta=None):
+    # Mismo archivo que usa Streamlit; sin dependencias extra (tomllib es estándar desde 3.11)
+    import tomllib
+    ruta = ruta or os.environ.get("COMPRADIA_SECRETS") or RUTA_SECRETOS
+    if not os.path.exists(ruta): return {}
+    with open(ruta, 'rb') as f: return tomllib.load(f)
+
+def configurar_desde_secretos(secretos):
+    general = secretos.get("general", {})
+    CONFIG['drive_folder_id'] = general.get("drive_folder_id")
+    CONFIG['master_sales_id'] = general.get("master_sales_id")
+    CONFIG['cache_dir'] = general.get("cache_dir", CONFIG['cache_dir'])
+    CONFIG['cache_max_mb'] = float(general.get("cache_max_mb", CONFIG['cache_max_mb']))
+    CONFIG['max_descargas'] = int(general.get("max_descargas", CONFIG['max_descargas']))
+    CONFIG['cache_cargas_mb'] = float(general.get("cache_cargas_mb", CONFIG['cache_cargas_mb']))
+    CONFIG['log_rendimiento'] = general.get("log_rendimiento", CONFIG['log_rendimiento'])
+    CONFIG['perfil_memoria'] = bool(general.get("perfil_memoria", CONFIG['perfil_memoria']))
+    CONFIG['chunk_subida_mb'] = float(general.get("chunk_subida_mb", CONFIG['chunk_subida_mb']))
+    CONFIG['reintentos_subida'] = int(general.get("reintentos_subida", CONFIG['reintentos_subida']))
+    CONFIG['espera_reintento_s'] = float(general.get("espera_reintento_s", CONFIG['espera_reintento_s']))
+    CONFIG['drive_async'] = bool(general.get("drive_async", CONFIG['drive_async']))
+    CONFIG['conexiones_drive'] = int(general.get("conexiones_drive", CONFIG['conexiones_drive']))
+    CONFIG['reintentos_drive'] = int(general.get("reintentos_drive", CONFIG['reintentos_drive']))
+    CONFIG['drive_url'] = general.get("drive_url", CONFIG['drive_url'])
+    CONFIG['horizontes'] = [int(h) for h in general.get("horizontes", CONFIG['horizontes'])]
+    # Misma regla que --horizontes: un horizonte de 0 o negativo daría columnas inf/NaN
+    if any(h < 1 for h in CONFIG['horizontes']): raise ValueError("[general] horizontes: los meses deben ser 1 o más")
+    if "gcp_service_account" in secretos: CONFIG['gcp_service_account'] = dict(secretos["gcp_service_account"])
+    if "agencias" in secretos: CONFIG['agencias'] = [dict(a) for a in secretos["agencias"]]
+    # Variables de entorno para correr desde cron sin tocar el archivo de secretos
+    if os.environ.get("COMPRADIA_CACHE_DIR"): CONFIG['cache_dir'] = os.environ["COMPRADIA_CACHE_DIR"]
+    return CONFIG
+
+def ruta_log_rendimiento():
+    return CONFIG['log_rendimiento'] or os.path.join(CONFIG['cache_dir'], "rendimiento.jsonl")
+
+def agencias():
+    return CONFIG['agencias'] or AGENCIAS
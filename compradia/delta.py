@@ -0,0 +1,133 @@
+import os
+import glob
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from compradia.config import CONFIG
+from compradia import motor
+from compradia.motor import codigos_partes, columnas_horizontes, construir_hoja, indexar_entradas, piezas_hoja
+
+# --- MODO DELTA ---
+# Por agencia se guarda en <cache_dir>/delta_<AGENCIA>.pkl la hoja de la última corrida, la huella de cada una
+# de sus filas y, por fila, la huella de todo lo que la alimenta: su fila del Sugerido y las filas de su N° PARTE en histórico (local y foráneo),
+# inventario (local y foráneo), tránsito y traspasos. En la siguiente corrida solo se arman las filas cuya
+# huella no estaba; las demás se copian de la hoja anterior. CAMBIOS = filas que salen distintas a la corrida
+# anterior (NUEVO / MODIFICADO) y partes que ya no están (ELIMINADO).
+
+PRIMO_FNV = np.uint64(1099511628211)
+
+def ruta_delta(agencia):
+    return os.path.join(CONFIG['cache_dir'], f"delta_{agencia}.pkl")
+
+def leer_estado(agencia):
+    try: return pd.read_pickle(ruta_delta(agencia))
+    except Exception: return None
+
+def guardar_estado(agencia, estado):
+    try:
+        os.makedirs(CONFIG['cache_dir'], exist_ok=True)
+        pd.to_pickle(estado, ruta_delta(agencia) + ".tmp")
+        os.replace(ruta_delta(agencia) + ".tmp", ruta_delta(agencia))
+    except Exception: pass
+
+def limpiar_estados_delta():
+    for ruta in glob.glob(os.path.join(CONFIG['cache_dir'], "delta_*.pkl")): os.remove(ruta)
+
+def _firma_codigo(h, codigo):
+    # Bytecode y constantes; las funciones anidadas (lambdas, generadores) se recorren en vez de usar su repr,
+    # que trae la dirección en memoria y cambiaría en cada proceso
+    h.update(codigo.co_code)
+    for constante in codigo.co_consts:
+        if hasattr(constante, 'co_code'): _firma_codigo(h, constante)
+        else: h.update(repr(constante).encode())
+
+def version_motor(agencia, foranea, columnas_extra=()):
+    # Si cambian las agencias, las columnas de horizontes o el código que arma la hoja, no se reusa nada de la corrida anterior
+    h = hashlib.sha1(json.dumps([agencia, foranea, list(columnas_extra)], sort_keys=True, default=str).encode())
+    for funcion in (motor.columnas_hoja, motor.columnas_horizontes, motor.nombres_horizontes, motor.piezas_hoja,
+                    motor.construir_hoja, motor.completar_y_ordenar, motor.calcular_formulas_dia, motor.numeros_excel, motor.numeros_en_referencia):
+        _firma_codigo(h, funcion.__code__)
+    return h.hexdigest()
+
+def huellas_filas(df):
+    # Hash por fila; los números se comparan como float para que 5 en int8, int64 o float dé la misma huella
+    if df.shape[1] == 0: return np.zeros(len(df), dtype=np.uint64)
+    normal = pd.DataFrame({i: df.iloc[:, i].astype(float) if df.iloc[:, i].dtype.kind in 'iufb' else df.iloc[:, i]
+                           for i in range(df.shape[1])})
+    return pd.util.hash_pandas_object(normal, index=False).to_numpy()
+
+def huellas_entradas(agencia, foranea, base, indices):
+    # Una huella por fila de la base; cada entrada suma sus filas por N° PARTE (si uno se repite entran todas)
+    partes = indices['partes']
+    codigos = codigos_partes(partes, base["N° PARTE"])
+    huellas = huellas_filas(base)
+    with np.errstate(over='ignore'):
+        for k, (pieza, _) in enumerate(piezas_hoja(agencia, foranea, indices)):
+            por_parte = np.zeros(len(partes.categories), dtype=np.uint64)
+            if pieza is not None and len(pieza): np.add.at(por_parte, pieza.index.to_numpy(), huellas_filas(pieza))
+            huellas = (huellas * PRIMO_FNV) ^ (por_parte[codigos] + np.uint64(k + 1))
+    return huellas
+
+def construir_hoja_delta(agencia, foranea, base, indices):
+    # Devuelve (hoja, cambios, filas recalculadas) y deja guardado el estado para la siguiente corrida
+    version = version_motor(agencia, foranea, columnas_horizontes(agencia, indices))
+    previo = leer_estado(agencia['nombre'])
+    if previo is not None and previo.get('version') != version: previo = None
+    # Con un N° PARTE repetido en alguna entrada el cruce multiplica filas: se arma la hoja completa
+    unicas = all(pieza is None or pieza.index.is_unique for pieza, _ in piezas_hoja(agencia, foranea, indices))
+    huellas = huellas_entradas(agencia, foranea, base, indices) if unicas else None
+
+    if previo is None or previo['huellas'] is None or huellas is None:
+        hoja = construir_hoja(agencia, foranea, base, indices)
+        salida = huellas_filas(hoja)
+        recalculadas = len(hoja)
+    else:
+        conocidas = pd.Index(previo['huellas'])
+        primeras = np.flatnonzero(~conocidas.duplicated())
+        pos = conocidas[primeras].get_indexer(huellas)
+        nuevas = pos < 0
+        copiadas = primeras[pos[~nuevas]]
+        trozos = [previo['hoja'].iloc[copiadas].set_axis(np.flatnonzero(~nuevas))]
+        salida = np.zeros(len(base), dtype=np.uint64)
+        salida[~nuevas] = previo['salida'][copiadas]
+        if nuevas.any():
+            armadas = construir_hoja(agencia, foranea, base[nuevas], indices)
+            salida[nuevas] = huellas_filas(armadas)
+            trozos.append(armadas.set_axis(np.flatnonzero(nuevas)))
+        hoja = pd.concat(trozos).sort_index().reset_index(drop=True)
+        # Las filas copiadas traen el diccionario de partes de la corrida anterior
+        hoja.isetitem(0, pd.Categorical(hoja.iloc[:, 0].astype(object), dtype=indices['partes']))
+        recalculadas = int(nuevas.sum())
+
+    cambios = cambios_hoja(hoja, salida, previo)
+    guardar_estado(agencia['nombre'], {'version': version, 'huellas': huellas, 'hoja': hoja, 'salida': salida})
+    return hoja, cambios, recalculadas
+
+def cambios_hoja(hoja, salida, previo):
+    # salida = huella de cada fila de la hoja; sin corrida anterior todo es NUEVO
+    partes = hoja.iloc[:, 0].astype(object)
+    if previo is None: distintas, estaba = np.ones(len(hoja), dtype=bool), np.zeros(len(hoja), dtype=bool)
+    else:
+        anterior = previo['hoja']
+        distintas = ~np.isin(salida, previo['salida'])
+        estaba = partes.isin(anterior.iloc[:, 0].astype(object)).to_numpy()
+    cambios = hoja[distintas]
+    cambios.insert(0, "CAMBIO", np.where(estaba[distintas], "MODIFICADO", "NUEVO"))
+    if previo is not None:
+        eliminadas = anterior[~anterior.iloc[:, 0].astype(object).isin(partes).to_numpy()]
+        eliminadas.insert(0, "CAMBIO", "ELIMINADO")
+        cambios = pd.concat([cambios, eliminadas], ignore_index=True)
+    return cambios.reset_index(drop=True)
+
+def construir_hojas_delta(agencias, entradas, pool=None):
+    # Igual que motor.construir_hojas, pero devuelve ({agencia: hoja}, {agencia: cambios}, {agencia: filas recalculadas})
+    por_nombre = {a['nombre']: a for a in agencias}
+    indices = indexar_entradas(entradas)
+    tareas = {a['nombre']: (a, por_nombre[a['foranea']], entradas[a['nombre']]['base'], indices) for a in agencias}
+    if pool is None: resultados = {nombre: construir_hoja_delta(*args) for nombre, args in tareas.items()}
+    else:
+        futuros = {nombre: pool.submit(construir_hoja_delta, *args) for nombre, args in tareas.items()}
+        resultados = {nombre: futuro.result() for nombre, futuro in futuros.items()}
+    return ({n: r[0] for n, r in resultados.items()}, {n: r[1] for n, r in resultados.items()},
+            {n: r[2] for n, r in resultados.items()})
@@ -0,0 +1,284 @@
+import io
+import os
+import time
+import random
+import datetime
+import hashlib
+import json
+import threading
+from contextlib import contextmanager
+from compradia.config import CONFIG
+from compradia.perf import etapa
+
+# Cliente de Google Drive. Las librerías de Google se importan solo al primer uso (arranque rápido
+# de la línea de comandos). Las credenciales de la cuenta de servicio se crean una vez por proceso (un solo
+# token para todos) y los clientes viven en un pool del módulo que sobrevive a las corridas y a los reruns de
+# Streamlit, aunque cada rerun y cada ThreadPoolExecutor usen hilos nuevos.
+# httplib2 no es thread-safe: con `with cliente_drive() as servicio:` cada hilo toma un cliente libre del pool
+# (o arma uno si todos están ocupados) y lo devuelve al salir.
+
+_credenciales = None
+_huella_pool = None
+_clientes_libres = []
+_servicio_fijo = None # Servicio inyectado (p.ej. el Drive local de benchmarks); lo usan todos los hilos
+_lock_servicio = threading.Lock()
+
+CARPETA = 'application/vnd.google-apps.folder'
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+VALIDEZ_CARPETAS_S = 600 # Una carpeta ya validada en este proceso no se vuelve a consultar en 10 min
+
+MESES_CARPETA = {1: "01_Enero", 2: "02_Febrero", 3: "03_Marzo", 4: "04_Abril", 5: "05_Mayo", 6: "06_Junio",
+                 7: "07_Julio", 8: "08_Agosto", 9: "09_Septiembre", 10: "10_Octubre", 11: "11_Noviembre", 12: "12_Diciembre"}
+
+def _crear_credenciales():
+    if CONFIG['drive_url']: return None # Drive HTTP local (benchmarks/drive_http.py): sin credenciales
+    from google.oauth2 import service_account
+    return service_account.Credentials.from_service_account_info(
+        CONFIG['gcp_service_account'], scopes=['https://www.googleapis.com/auth/drive']
+    )
+
+def _construir_servicio(creds):
+    import httplib2
+    from googleapiclient.discovery import build
+    if CONFIG['drive_url']:
+        return build('drive', 'v3', http=httplib2.Http(), client_options={'api_endpoint': f"{CONFIG['drive_url']}/drive/v3/"},
+                     cache_discovery=False, static_discovery=True)
+    from google_auth_httplib2 import AuthorizedHttp
+    # Conexión propia, credenciales compartidas: el token se pide una vez y lo usan todos los clientes
+    return build('drive', 'v3', http=AuthorizedHttp(creds, http=httplib2.Http()), cache_discovery=False)
+
+def _huella_credenciales():
+    return hashlib.sha1(json.dumps([CONFIG['gcp_service_account'], CONFIG['drive_url']], sort_keys=True).encode()).hexdigest()
+
+def drive_disponible():
+    return bool(CONFIG['gcp_service_account'])
+
+def fijar_servicio_drive(servicio):
+    global _servicio_fijo
+    _servicio_fijo = servicio
+
+@contextmanager
+def cliente_drive():
+    global _credenciales, _huella_pool
+    if _servicio_fijo is not None:
+        yield _servicio_fijo
+        return
+    huella = _huella_credenciales()
+    with _lock_servicio:
+        if _huella_pool != huella:
+            # Credenciales nuevas (o primer uso): los clientes anteriores ya no sirven
+            _credenciales, _huella_pool = _crear_credenciales(), huella
+            _clientes_libres.clear()
+        servicio = _clientes_libres.pop() if _clientes_libres else None
+        creds = _credenciales
+    if servicio is None: servicio = _construir_servicio(creds)
+    try:
+        yield servicio
+    finally:
+        with _lock_servicio:
+            if _huella_pool == huella: _clientes_libres.append(servicio)
+
+def escapar_q(texto):
+    # Literal de cadena para la sintaxis de consultas de Drive: se escapan \ y '
+    return str(texto).replace("\\", "\\\\").replace("'", "\\'")
+
+def buscar_o_crear_carpeta(nombre_carpeta, parent_id):
+    try:
+        query = f"mimeType='{CARPETA}' and name='{escapar_q(nombre_carpeta)}' and '{escapar_q(parent_id)}' in parents and trashed=false"
+        with etapa('drive.carpeta', carpeta=nombre_carpeta), cliente_drive() as servicio:
+            results = servicio.files().list(
+                q=query, fields="files(id, name)", supportsAllDrives=True, includeItemsFromAllDrives=True
+            ).execute()
+        files = results.get('files', [])
+        if files: return files[0]['id']
+        else:
+            metadata = {'name': nombre_carpeta, 'mimeType': CARPETA, 'parents': [parent_id]}
+            with etapa('drive.crear_carpeta', carpeta=nombre_carpeta), cliente_drive() as servicio:
+                folder = servicio.files().create(body=metadata, fields='id', supportsAllDrives=True).execute()
+            return folder.get('id')
+    except Exception: return None
+
+# --- CARPETAS DE SALIDA (CACHÉ PERSISTENTE) ---
+# "<id padre>/<nombre>" -> id de carpeta, en <cache_dir>/carpetas_drive.json. Si todo el camino año/mes está en
+# caché basta una sola consulta (files.get de la carpeta del mes) para validar que sigue existiendo, no está en
+# la papelera y cuelga del mismo año; si no, se busca (o crea) nivel por nivel como antes.
+
+_carpetas = None
+_validadas = {} # id -> momento de la última validación en este proceso
+_lock_carpetas = threading.Lock()
+
+def ruta_carpetas():
+    return os.path.join(CONFIG['cache_dir'], "carpetas_drive.json")
+
+def _clave_carpeta(parent_id, nombre):
+    return f"{parent_id}/{nombre}"
+
+def _cache_carpetas():
+    global _carpetas
+    if _carpetas is None:
+        try:
+            with open(ruta_carpetas(), encoding='utf-8') as f: _carpetas = json.load(f)
+        except Exception: _carpetas = {}
+    return _carpetas
+
+def _guardar_carpetas():
+    try:
+        os.makedirs(CONFIG['cache_dir'], exist_ok=True)
+        with open(ruta_carpetas() + ".tmp", 'w', encoding='utf-8') as f: json.dump(_carpetas, f)
+        os.replace(ruta_carpetas() + ".tmp", ruta_carpetas())
+    except Exception: pass
+
+def olvidar_carpetas():
+    global _carpetas
+    with _lock_carpetas:
+        _carpetas = {}
+        _validadas.clear()
+        if os.path.exists(ruta_carpetas()): os.remove(ruta_carpetas())
+
+def _es_carpeta_de(meta, parent_id):
+    return bool(meta) and meta.get('mimeType') == CARPETA and not meta.get('trashed') and parent_id in meta.get('parents', [])
+
+def carpeta_valida(folder_id, parent_id):
+    try:
+        with etapa('drive.validar_carpeta', carpeta=folder_id), cliente_drive() as servicio:
+            meta = servicio.files().get(fileId=folder_id, fields="id, mimeType, trashed, parents", supportsAllDrives=True).execute()
+        return _es_carpeta_de(meta, parent_id)
+    except Exception: return False
+
+def camino_valido(camino, raiz):
+    # camino = ids de carpeta desde raiz hacia abajo. Con drive_async se valida el camino completo en un solo /batch;
+    # si no, basta la última carpeta (un files.get)
+    padres = [raiz] + camino[:-1]
+    if not CONFIG['drive_async']: return carpeta_valida(camino[-1], padres[-1])
+    from compradia.drive_async import metadatos_lote
+    try: metas = metadatos_lote(camino, "id, mimeType, trashed, parents")
+    except Exception: return False
+    return all(_es_carpeta_de(metas.get(folder_id), padre) for folder_id, padre in zip(camino, padres))
+
+def resolver_carpeta(nombres, raiz):
+    # nombres = camino de carpetas bajo raiz, p.ej. ["2026", "10_Octubre"]; devuelve el id de la última o None
+    with _lock_carpetas:
+        cache = _cache_carpetas()
+        camino, padre = [], raiz
+        for nombre in nombres:
+            folder_id = cache.get(_clave_carpeta(padre, nombre))
+            if not folder_id: break
+            camino.append(folder_id)
+            padre = folder_id
+    if camino and len(camino) == len(nombres):
+        hoja = camino[-1]
+        if time.time() - _validadas.get(hoja, 0) < VALIDEZ_CARPETAS_S: return hoja
+        if camino_valido(camino, raiz):
+            with _lock_carpetas: _validadas.update({folder_id: time.time() for folder_id in camino})
+            return hoja
+
+    padre, nuevas = raiz, {}
+    for nombre in nombres:
+        folder_id = buscar_o_crear_carpeta(nombre, padre)
+        if not folder_id: return None
+        nuevas[_clave_carpeta(padre, nombre)] = folder_id
+        padre = folder_id
+    with _lock_carpetas:
+        _cache_carpetas().update(nuevas)
+        _validadas.update({folder_id: time.time() for folder_id in nuevas.values()})
+        _guardar_carpetas()
+    return padre
+
+# --- SUBIDA REANUDABLE ---
+
+def chunk_subida():
+    # Drive exige trozos múltiplos de 256 KB
+    return max(1, round(CONFIG['chunk_subida_mb'] * 4)) * 256 * 1024
+
+def _reintentable(error):
+    from googleapiclient.errors import HttpError
+    if isinstance(error, HttpError): return error.resp.status in ESTADOS_REINTENTABLES
+    return isinstance(error, OSError) or type(error).__module__.startswith('httplib2')
+
+def subir_reanudable(peticion, evento=None):
+    # Trozo por trozo. Si un trozo falla (red o 5xx/429) se espera con backoff exponencial y el siguiente
+    # next_chunk pregunta a Drive el último byte recibido y sigue desde ahí, sin volver a empezar.
+    # Si la sesión de subida expiró (404/410) se abre una nueva desde el byte 0.
+    from googleapiclient.errors import HttpError
+    respuesta, seguidas, reintentos, trozos = None, 0, 0, 0
+    while respuesta is None:
+        try:
+            _, respuesta = peticion.next_chunk()
+            seguidas = 0
+            trozos += 1
+        except Exception as error:
+            sesion_vencida = isinstance(error, HttpError) and error.resp.status in (404, 410) and peticion.resumable_uri
+            if not (sesion_vencida or _reintentable(error)) or seguidas >= CONFIG['reintentos_subida']: raise
+            if sesion_vencida: peticion.resumable_uri, peticion.resumable_progress = None, 0
+            time.sleep(CONFIG['espera_reintento_s'] * 2 ** seguidas * (0.5 + random.random() / 2))
+            seguidas += 1
+            reintentos += 1
+    if evento is not None: evento.update({'trozos': trozos, 'reintentos': reintentos})
+    return respuesta
+
+def subir_excel_a_drive(buffer, nombre_archivo):
+    # Los errores de la subida se propagan: cada interfaz decide cómo mostrarlos
+    from googleapiclient.errors import HttpError
+    fecha_hoy = datetime.datetime.now()
+    camino = [str(fecha_hoy.year), MESES_CARPETA[fecha_hoy.month]]
+    id_mes = resolver_carpeta(camino, CONFIG['drive_folder_id'])
+    if not id_mes: return None
+    try: return subir_a_carpeta(buffer, nombre_archivo, id_mes)
+    except HttpError as error:
+        # 404 al abrir la subida = la carpeta del mes en caché ya no existe (borrada o movida después de validarla):
+        # se olvida la caché de carpetas y se intenta una vez más con la carpeta resuelta de nuevo
+        if error.resp.status != 404: raise
+    olvidar_carpetas()
+    id_mes = resolver_carpeta(camino, CONFIG['drive_folder_id'])
+    if not id_mes: return None
+    buffer.seek(0)
+    return subir_a_carpeta(buffer, nombre_archivo, id_mes)
+
+def subir_a_carpeta(buffer, nombre_archivo, id_mes):
+    from googleapiclient.http import MediaIoBaseUpload
+    media = MediaIoBaseUpload(buffer, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                              chunksize=chunk_subida(), resumable=True)
+    file_metadata = {'name': nombre_archivo, 'parents': [id_mes]}
+    with etapa('drive.subida', archivo=nombre_archivo, bytes_subidos=buffer.getbuffer().nbytes) as e, cliente_drive() as servicio:
+        peticion = servicio.files().create(body=file_metadata, media_body=media, fields='id, webViewLink', supportsAllDrives=True)
+        archivo = subir_reanudable(peticion, e)
+    return archivo.get('webViewLink')
+
+def descargar_archivo_drive(file_id):
+    try:
+        from googleapiclient.http import MediaIoBaseDownload
+        with etapa('drive.descarga', archivo=file_id) as e, cliente_drive() as servicio:
+            request = servicio.files().get_media(fileId=file_id)
+            file = io.BytesIO()
+            downloader = MediaIoBaseDownload(file, request)
+            done = False
+            while done is False: status, done = downloader.next_chunk()
+            e['bytes_descargados'] = file.tell()
+        file.seek(0)
+        return file
+    except Exception as e: return None
+
+def buscar_archivos_ventas(agencia, anios):
+    archivos_encontrados = []
+    if not CONFIG['master_sales_id']:
+        return []
+
+    # Una sola consulta para todos los años (antes era una por año)
+    filtro_anios = " or ".join(f"name contains '{escapar_q(anio)}'" for anio in anios)
+    query = f"name contains '{escapar_q(agencia)}' and ({filtro_anios}) and name contains 'MASTER' and '{escapar_q(CONFIG['master_sales_id'])}' in parents and trashed=false"
+    if CONFIG['drive_async']:
+        # Mismas páginas y campos, por el pool de conexiones de compradia.drive_async
+        from compradia.drive_async import listar
+        return listar(query)
+    page_token = None
+    while True:
+        with etapa('drive.listar', agencia=agencia) as e, cliente_drive() as servicio:
+            results = servicio.files().list(
+                q=query, fields="nextPageToken, files(id, name, modifiedTime, md5Checksum)", pageSize=1000,
+                pageToken=page_token, supportsAllDrives=True, includeItemsFromAllDrives=True
+            ).execute()
+            e['filas_salida'] = len(results.get('files', []))
+        archivos_encontrados.extend(results.get('files', []))
+        page_token = results.get('nextPageToken')
+        if not page_token: break
+    return archivos_encontrados
@@ -0,0 +1,188 @@
+import io
+import json
+import uuid
+import random
+import asyncio
+import hashlib
+import threading
+from urllib.parse import quote, urlencode
+from compradia.config import CONFIG
+from compradia.drive import ESTADOS_REINTENTABLES
+from compradia.perf import corrida_actual, etapa, fijar_corrida
+
+# Acceso asíncrono a Drive v3 con httpx.AsyncClient: un pool de conexiones keep-alive, un semáforo que limita
+# las peticiones simultáneas (conexiones_drive), reintentos con backoff ante 429/5xx y metadatos en lote
+# (/batch/drive/v3, hasta 100 files.get en una sola petición).
+# Los clientes viven en un event loop propio en un hilo de fondo: el pool de conexiones se comparte entre corridas
+# y reruns de Streamlit, y el código síncrono (app, línea de comandos, compradia.historico) lo usa con
+# correr(corrutina) o enviar(corrutina) -> concurrent.futures.Future sin tener su propio loop.
+# Con CONFIG['drive_url'] apunta a otro servidor (p.ej. benchmarks/drive_http.py) y no usa credenciales.
+
+URL_DRIVE = "https://www.googleapis.com"
+LOTE_MAXIMO = 100
+CAMPOS_METADATOS = "id, name, mimeType, trashed, parents, modifiedTime, md5Checksum"
+
+_bucle = None
+_hilo_bucle = None
+_lock_bucle = threading.Lock()
+_clientes = {} # Solo se toca desde el hilo del bucle
+
+def bucle_drive():
+    global _bucle, _hilo_bucle
+    with _lock_bucle:
+        if _bucle is None or not _hilo_bucle.is_alive():
+            _bucle = asyncio.new_event_loop()
+            _hilo_bucle = threading.Thread(target=_bucle.run_forever, name="drive-async", daemon=True)
+            _hilo_bucle.start()
+    return _bucle
+
+async def _en_corrida(corrida, corrutina):
+    # La tarea corre en el hilo del bucle: sus etapas (y las de las tareas que lance) van a la corrida de quien la envió
+    fijar_corrida(corrida)
+    return await corrutina
+
+def enviar(corrutina):
+    return asyncio.run_coroutine_threadsafe(_en_corrida(corrida_actual(), corrutina), bucle_drive())
+
+def correr(corrutina):
+    return enviar(corrutina).result()
+
+class _Credenciales:
+    # Token de la cuenta de servicio; se refresca en un hilo (google-auth es síncrono) y una sola vez a la vez
+    def __init__(self, info):
+        from google.oauth2 import service_account
+        self.creds = service_account.Credentials.from_service_account_info(info, scopes=['https://www.googleapis.com/auth/drive'])
+        self._lock = asyncio.Lock()
+
+    async def encabezados(self):
+        async with self._lock:
+            if not self.creds.valid:
+                import httplib2
+                from google_auth_httplib2 import Request
+                await asyncio.to_thread(self.creds.refresh, Request(httplib2.Http()))
+        return {'Authorization': f"Bearer {self.creds.token}"}
+
+class ClienteDrive:
+    def __init__(self, base_url=None, conexiones=None, timeout=120.0):
+        import httpx
+        self.base_url = base_url or CONFIG['drive_url'] or URL_DRIVE
+        self.conexiones = conexiones or CONFIG['conexiones_drive']
+        self._credenciales = _Credenciales(CONFIG['gcp_service_account']) if self.base_url == URL_DRIVE else None
+        self._http = httpx.AsyncClient(base_url=self.base_url, timeout=timeout,
+                                       limits=httpx.Limits(max_connections=self.conexiones, max_keepalive_connections=self.conexiones))
+        self._limite = asyncio.Semaphore(self.conexiones)
+
+    async def __aenter__(self): return self
+    async def __aexit__(self, *exc): await self.cerrar()
+
+    async def cerrar(self):
+        await self._http.aclose()
+
+    async def _pedir(self, metodo, ruta, headers=None, **kwargs):
+        import httpx
+        reintentos = CONFIG['reintentos_drive']
+        for intento in range(reintentos + 1):
+            try:
+                async with self._limite:
+                    encabezados = await self._credenciales.encabezados() if self._credenciales else {}
+                    respuesta = await self._http.request(metodo, ruta, headers={**encabezados, **(headers or {})}, **kwargs)
+                if respuesta.status_code not in ESTADOS_REINTENTABLES or intento == reintentos:
+                    respuesta.raise_for_status()
+                    return respuesta
+            except httpx.TransportError:
+                if intento == reintentos: raise
+            await asyncio.sleep(CONFIG['espera_reintento_s'] * 2 ** intento * (0.5 + random.random() / 2))
+
+    async def listar(self, q, fields="nextPageToken, files(id, name, modifiedTime, md5Checksum)", page_size=1000):
+        archivos, page_token = [], None
+        while True:
+            params = {'q': q, 'fields': fields, 'pageSize': page_size, 'supportsAllDrives': 'true', 'includeItemsFromAllDrives': 'true'}
+            if page_token: params['pageToken'] = page_token
+            with etapa('drive_async.listar') as e:
+                datos = (await self._pedir("GET", "/drive/v3/files", params=params)).json()
+                e['filas_salida'] = len(datos.get('files', []))
+            archivos.extend(datos.get('files', []))
+            page_token = datos.get('nextPageToken')
+            if not page_token: return archivos
+
+    async def metadatos(self, file_id, fields=CAMPOS_METADATOS):
+        params = {'fields': fields, 'supportsAllDrives': 'true'}
+        return (await self._pedir("GET", f"/drive/v3/files/{quote(file_id, safe='')}", params=params)).json()
+
+    async def metadatos_lote(self, file_ids, fields=CAMPOS_METADATOS):
+        # {id: metadatos, o None si no existe o no se puede ver}; los lotes de 100 salen en paralelo
+        file_ids = list(file_ids)
+        lotes = [file_ids[i:i + LOTE_MAXIMO] for i in range(0, len(file_ids), LOTE_MAXIMO)]
+        resultado = {}
+        for metas in await asyncio.gather(*(self._lote(lote, fields) for lote in lotes)): resultado.update(metas)
+        return resultado
+
+    async def _lote(self, file_ids, fields):
+        frontera = f"compradia_{uuid.uuid4().hex}"
+        consulta = urlencode({'fields': fields, 'supportsAllDrives': 'true'})
+        cuerpo = "".join(f"--{frontera}\r\nContent-Type: application/http\r\nContent-ID: <{k}>\r\n\r\n"
+                         f"GET /drive/v3/files/{quote(file_id, safe='')}?{consulta} HTTP/1.1\r\n\r\n"
+                         for k, file_id in enumerate(file_ids)) + f"--{frontera}--\r\n"
+        with etapa('drive_async.lote', filas_entrada=len(file_ids)):
+            respuesta = await self._pedir("POST", "/batch/drive/v3", content=cuerpo.encode(),
+                                          headers={'Content-Type': f"multipart/mixed; boundary={frontera}"})
+        metas = dict.fromkeys(file_ids)
+        for content_id, estado, contenido in leer_multipart(respuesta.headers['content-type'], respuesta.content):
+            k = int(content_id.strip('<>').rsplit('-', 1)[-1])
+            if estado == 200: metas[file_ids[k]] = json.loads(contenido)
+        return metas
+
+    async def descargar(self, file_id):
+        with etapa('drive_async.descarga', archivo=file_id) as e:
+            respuesta = await self._pedir("GET", f"/drive/v3/files/{quote(file_id, safe='')}",
+                                          params={'alt': 'media', 'supportsAllDrives': 'true'})
+            e['bytes_descargados'] = len(respuesta.content)
+        return respuesta.content
+
+def leer_multipart(content_type, contenido):
+    # Respuesta de /batch: cada parte es una respuesta HTTP completa -> [(Content-ID, estado, cuerpo)]
+    frontera = content_type.split("boundary=", 1)[1].split(";")[0].strip().strip('"')
+    partes = []
+    for parte in contenido.split(b"--" + frontera.encode())[1:]:
+        if parte.startswith(b"--"): break
+        cabeceras, _, http = parte.strip(b"\r\n").partition(b"\r\n\r\n")
+        content_id = next((linea.split(b":", 1)[1].strip().decode() for linea in cabeceras.split(b"\r\n")
+                           if linea.lower().startswith(b"content-id:")), "")
+        estado_y_cabeceras, _, cuerpo = http.partition(b"\r\n\r\n")
+        partes.append((content_id, int(estado_y_cabeceras.split(b" ", 2)[1]), cuerpo))
+    return partes
+
+# --- USO DESDE CÓDIGO SÍNCRONO ---
+
+def _huella_cliente():
+    return (CONFIG['drive_url'] or URL_DRIVE, CONFIG['conexiones_drive'],
+            hashlib.sha1(json.dumps(CONFIG['gcp_service_account'], sort_keys=True).encode()).hexdigest())
+
+async def cliente_compartido():
+    # Un cliente (y su pool de conexiones) por servidor/credenciales, reutilizado entre llamadas
+    clave = _huella_cliente()
+    if clave not in _clientes: _clientes[clave] = ClienteDrive()
+    return _clientes[clave]
+
+async def _descargar_archivo(file_id):
+    # Mismo contrato que compradia.drive.descargar_archivo_drive: BytesIO o None
+    try: return io.BytesIO(await (await cliente_compartido()).descargar(file_id))
+    except Exception: return None
+
+def enviar_descarga(file_id):
+    return enviar(_descargar_archivo(file_id))
+
+def descargar_archivos(file_ids):
+    # {id: BytesIO o None}, todas las descargas en paralelo hasta conexiones_drive
+    async def todas():
+        contenidos = await asyncio.gather(*(_descargar_archivo(file_id) for file_id in file_ids))
+        return dict(zip(file_ids, contenidos))
+    return correr(todas())
+
+def metadatos_lote(file_ids, fields=CAMPOS_METADATOS):
+    async def lote(): return await (await cliente_compartido()).metadatos_lote(file_ids, fields)
+    return correr(lote())
+
+def listar(q, **kwargs):
+    async def listado(): return await (await cliente_compartido()).listar(q, **kwargs)
+    return correr(listado())
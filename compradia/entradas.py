@@ -0,0 +1,58 @@
+import pandas as pd
+from compradia.lectura import leer_excel_proyectado
+from compradia.motor import compactar
+
+# --- CARGA DE ARCHIVOS DE ENTRADA ---
+# Reciben un archivo subido (o cualquier objeto tipo archivo con .name) y devuelven None si no se pudo leer.
+
+def limpiar_inventario(archivo, nombre_sucursal):
+    try:
+        engine = 'xlrd' if archivo.name.endswith('.xls') else 'openpyxl'
+        col_indices = [0, 1, 2, 4, 8, 9, 10, 11]
+        col_names = ["N° PARTE", "DESCR", "CLASIF", "PRECIO UNITARIO", "EXIST", "FEC INGRESO", "FEC ULT COMP", "FEC ULT VTA"]
+        # Solo se leen las 8 columnas útiles y se descartan al vuelo las filas sin FEC INGRESO
+        df_clean = leer_excel_proyectado(archivo, col_indices, filtro=(9, lambda v: v != ""), engine=engine)
+        df_clean.columns = col_names
+        df_clean = df_clean.dropna(subset=["FEC INGRESO"])
+        df_clean["N° PARTE"] = df_clean["N° PARTE"].astype(str).str.strip()
+        return compactar(df_clean)
+    except Exception: return None
+
+def cargar_base_sugerido(archivo, columnas=None):
+    # columnas: si se da, solo se conservan esas (el reporte no usa el resto del Sugerido)
+    try:
+        df = pd.read_excel(archivo, usecols=None if columnas is None else (lambda c: str(c).strip() in columnas))
+        df.columns = df.columns.str.strip()
+        df["N° PARTE"] = df["N° PARTE"].astype(str).str.strip()
+        if "Last 12 Month Demand" in df.columns:
+            df["Last 12 Month Demand"] = pd.to_numeric(df["Last 12 Month Demand"], errors='coerce').fillna(0)
+            df["CONSUMO MENSUAL"] = df["Last 12 Month Demand"] / 12
+        else: df["CONSUMO MENSUAL"] = 0
+        df["2"] = df["CONSUMO MENSUAL"] / 2
+        return compactar(df)
+    except Exception: return None
+
+def procesar_transito(archivo):
+    try:
+        df = pd.read_excel(archivo)
+        df.columns = df.columns.str.strip() 
+        cols = ["N° PARTE", "TRANSITO"]
+        for c in cols: 
+            if c not in df.columns: df[c] = 0
+        df = df[cols].copy()
+        df["N° PARTE"] = df["N° PARTE"].astype(str).str.strip()
+        return compactar(df.groupby("N° PARTE", as_index=False)["TRANSITO"].sum())
+    except Exception: return None
+
+def procesar_traspasos(archivo, filtro):
+    try:
+        engine = 'xlrd' if archivo.name.endswith('.xls') else 'openpyxl'
+        # Se leen solo las columnas 0, 2 y 4 y se conservan al vuelo las filas del tipo pedido
+        df = leer_excel_proyectado(archivo, [0, 2, 4], filtro=(0, lambda v: isinstance(v, str) and v.strip() == filtro), engine=engine)
+        if df.empty: return pd.DataFrame(columns=["N° PARTE", "CANTIDAD_TRASPASO"])
+        df = df[[2, 4]].copy()
+        df.columns = ["N° PARTE", "CANTIDAD_TRASPASO"]
+        df["N° PARTE"] = df["N° PARTE"].astype(str).str.strip()
+        df["CANTIDAD_TRASPASO"] = pd.to_numeric(df["CANTIDAD_TRASPASO"], errors='coerce').fillna(0).abs()
+        return compactar(df.groupby("N° PARTE", as_index=False)["CANTIDAD_TRASPASO"].sum())
+    except Exception: return None
@@ -0,0 +1,173 @@
+import pandas as pd
+import xlsxwriter
+from compradia.motor import nombre_hoja, nombre_hoja_cambios
+
+# --- DISEÑO Y FORMULAS DE EXCEL (ELEGANTES) ---
+# (columna, plantilla) con {r} = fila de Excel; mismas letras en todas las hojas DIA.
+# Su resultado se calcula en pandas con compradia.motor.calcular_formulas_dia.
+FORMULAS_DIA = [
+    (2, '=IFERROR(IF(((B{r}+S{r}+P{r})/I{r})>1.5, MIN(I{r},B{r}), IF(((R{r}+E{r})/I{r})>3, 0, B{r}-P{r})), 0)'), # POR FINCAR
+    (3, '=J{r}-S{r}'),
+    (18, '=R{r}+E{r}+P{r}'), # INV. TOTAL
+    (19, '=IFERROR(S{r}/I{r}, 0)'), # MESES VENTA ACTUAL
+    (20, '=IFERROR((C{r}+S{r}+P{r})/I{r}, 0)'), # MESES VENTA SUGERIDO
+]
+COL_NUEVO_TRASPASO = 14 # Validación SI/NO
+BLOQUE_FILAS = 10_000 # El modo rápido convierte a objetos Python por bloques, no la hoja completa de una vez
+ERROR_EXCEL = '#VALUE!'
+
+def valores_formula(df, col):
+    return [ERROR_EXCEL if pd.isna(v) else v for v in df.iloc[:, col].tolist()]
+
+def estilos_excel(workbook):
+    # ESTILOS CORPORATIVOS CRA
+    base = {'bold': True, 'text_wrap': True, 'valign': 'vcenter', 'align': 'center', 'border': 1}
+    return {
+        'base': workbook.add_format({**base, 'bg_color': '#10345C', 'font_color': 'white'}),
+        'local': workbook.add_format({**base, 'bg_color': '#4B8BBE', 'font_color': 'white'}),
+        'foraneo': workbook.add_format({**base, 'bg_color': '#A64d4d', 'font_color': 'white'}),
+        'input': workbook.add_format({**base, 'bg_color': '#F2F2F2', 'font_color': 'black'}),
+        'celda': workbook.add_format({'align': 'center', 'valign': 'vcenter', 'border': 1, 'border_color': '#D3D3D3'}),
+    }
+
+def estilo_encabezado(estilos, col_num, value, marcas):
+    # marcas = (corto local, corto foráneo), p.ej. ("CUAUTI", "TULTI")
+    col_name = str(value).upper()
+    local, foraneo = marcas
+    if col_num < 3:
+        return estilos['base']
+    elif "NUEVO TRASPASO" in col_name or "CANTIDAD A TRASPASAR" in col_name:
+        return estilos['input']
+    elif local in col_name or col_name == "HITS" or col_name == "EXISTENCIA" or col_name == "CONSUMO MENSUAL":
+        return estilos['local']
+    elif foraneo in col_name or "FORANEO" in col_name:
+        return estilos['foraneo']
+    return estilos['base']
+
+def preparar_hoja(worksheet, estilos, df, marcas):
+    # INMOVILIZAR PANELES (FILA 1)
+    worksheet.freeze_panes(1, 0)
+    worksheet.set_column('A:A', 20)
+    worksheet.set_column('B:Z', 14, estilos['celda'])
+    # APLICAR FORMATO A ENCABEZADOS
+    for col_num, value in enumerate(df.columns.values):
+        worksheet.write(0, col_num, value, estilo_encabezado(estilos, col_num, value, marcas))
+
+def formulas_columna(plantilla, n, primera=2):
+    # Todas las fórmulas de una columna de golpe: se intercalan los números de fila en la plantilla
+    filas = pd.Series(range(primera, primera + n)).astype(str)
+    partes = plantilla.split('{r}')
+    formulas = pd.Series(partes[0], index=filas.index)
+    for parte in partes[1:]: formulas = formulas + filas + parte
+    return formulas.to_numpy(dtype=object)
+
+def formatear_excel_final(writer, df, sheet_name, marcas, solo_valores=False):
+    workbook = writer.book
+    worksheet = writer.sheets[sheet_name]
+    estilos = estilos_excel(workbook)
+    preparar_hoja(worksheet, estilos, df, marcas)
+
+    # INSERTAR FÓRMULAS (con el valor ya calculado en pandas como caché)
+    cache = {col: valores_formula(df, col) for col, _ in FORMULAS_DIA}
+    start_row = 1
+    for i in range(len(df)):
+        row = start_row + i
+        excel_row = row + 1
+        for col, plantilla in FORMULAS_DIA:
+            if solo_valores: worksheet.write(row, col, cache[col][i], estilos['celda'])
+            else: worksheet.write_formula(row, col, plantilla.format(r=excel_row), estilos['celda'], cache[col][i])
+        worksheet.data_validation(row, COL_NUEVO_TRASPASO, row, COL_NUEVO_TRASPASO, {'validate': 'list', 'source': ['SI', 'NO']})
+
+class HojaFormulasClasicas(xlsxwriter.worksheet.Worksheet):
+    # Las fórmulas DIA solo usan IFERROR/IF/MIN: se omite la búsqueda de funciones "futuras" de Excel
+    # (~30 expresiones regulares por celda), que era la mayor parte del tiempo de escritura.
+    # _prepare_formula es privado de XlsxWriter (versión acotada en requirements.txt); ver HOJA_FORMULAS_RAPIDA.
+    def _prepare_formula(self, formula, expand_future_functions=False):
+        return formula[1:] if formula.startswith('=') else formula
+
+def _atajo_formulas_valido():
+    # El atajo solo se usa si XlsxWriter sigue teniendo el método con esa firma y, con todas las funciones
+    # futuras expandidas, deja las fórmulas DIA igual que el atajo (o sea, ninguna lleva prefijo _xlfn.)
+    try:
+        hoja = xlsxwriter.worksheet.Worksheet()
+        return all(hoja._prepare_formula(f, True) == HojaFormulasClasicas._prepare_formula(hoja, f)
+                   for f in (plantilla.format(r=2) for _, plantilla in FORMULAS_DIA))
+    except Exception: return False
+
+# None = hoja normal de XlsxWriter: más lenta, pero correcta si cambió el método privado o las fórmulas
+HOJA_FORMULAS_RAPIDA = HojaFormulasClasicas if _atajo_formulas_valido() else None
+
+def escribir_hoja_rapida(workbook, df, sheet_name, marcas, solo_valores=False):
+    # Modo rápido: el libro va en constant_memory, así que todo se escribe fila por fila y en orden.
+    # Las fórmulas se generan por columna y la validación SI/NO es un solo rango.
+    worksheet = workbook.add_worksheet(sheet_name, worksheet_class=HOJA_FORMULAS_RAPIDA)
+    estilos = estilos_excel(workbook)
+    preparar_hoja(worksheet, estilos, df, marcas)
+
+    n = len(df)
+    if n == 0: return
+    worksheet.data_validation(1, COL_NUEVO_TRASPASO, n, COL_NUEVO_TRASPASO, {'validate': 'list', 'source': ['SI', 'NO']})
+    for desde in range(0, n, BLOQUE_FILAS):
+        escribir_bloque(worksheet, df.iloc[desde:desde + BLOQUE_FILAS], desde + 1, solo_valores)
+
+def escribir_bloque(worksheet, df, primera, solo_valores):
+    # primera = fila de Excel (base 0) de la primera fila del bloque
+    valores = df.astype(object).where(df.notna(), None).to_numpy()
+    cache = [(col, valores_formula(df, col)) for col, _ in FORMULAS_DIA]
+    for col, valores_col in cache: valores[:, col] = valores_col
+    if solo_valores:
+        for row, fila in enumerate(valores, start=primera):
+            worksheet.write_row(row, 0, fila)
+        return
+
+    formulas = [(col, formulas_columna(plantilla, len(df), primera + 1), valores_col)
+                for (col, plantilla), (_, valores_col) in zip(FORMULAS_DIA, cache)]
+    for col, _ in FORMULAS_DIA: valores[:, col] = None
+    for i, fila in enumerate(valores):
+        row = primera + i
+        worksheet.write_row(row, 0, fila)
+        for col, formulas_col, valores_col in formulas:
+            worksheet.write_formula(row, col, formulas_col[i], None, valores_col[i])
+
+def escribir_hoja_cambios(workbook, df, sheet_name, marcas):
+    # Hoja CAMBIOS del modo delta: solo valores (las filas no son contiguas, las fórmulas no aplicarían)
+    worksheet = workbook.add_worksheet(sheet_name)
+    preparar_hoja(worksheet, estilos_excel(workbook), df, marcas)
+    for desde in range(0, len(df), BLOQUE_FILAS):
+        bloque = df.iloc[desde:desde + BLOQUE_FILAS]
+        for row, fila in enumerate(bloque.astype(object).where(bloque.notna(), None).to_numpy(), start=desde + 1):
+            worksheet.write_row(row, 0, fila)
+
+def libro_rapido(buffer):
+    # Mismos formatos de fecha que usa pandas al escribir con xlsxwriter
+    return xlsxwriter.Workbook(buffer, {'constant_memory': True, 'default_date_format': 'YYYY-MM-DD HH:MM:SS'})
+
+def escribir_reporte(buffer, agencias, hojas, rapido=True, solo_valores=False, cambios=None):
+    # Una hoja "DIA <agencia>" por agencia, en el orden de la configuración; en modo delta, además "CAMBIOS <agencia>"
+    cortos = {a['nombre']: a['corto'] for a in agencias}
+    if rapido:
+        workbook = libro_rapido(buffer)
+        for a in agencias:
+            escribir_hoja_rapida(workbook, hojas[a['nombre']], nombre_hoja(a), (a['corto'], cortos[a['foranea']]), solo_valores)
+    else:
+        writer = pd.ExcelWriter(buffer, engine='xlsxwriter')
+        workbook = writer.book
+        for a in agencias:
+            hojas[a['nombre']].to_excel(writer, sheet_name=nombre_hoja(a), index=False)
+            formatear_excel_final(writer, hojas[a['nombre']], nombre_hoja(a), (a['corto'], cortos[a['foranea']]), solo_valores)
+    for a in agencias if cambios else []:
+        escribir_hoja_cambios(workbook, cambios[a['nombre']], nombre_hoja_cambios(a), (a['corto'], cortos[a['foranea']]))
+    if rapido: workbook.close()
+    else: writer.close()
+    buffer.seek(0)
+    return buffer
+
+def escribir_cambios(buffer, agencias, cambios):
+    # Archivo compacto solo con las hojas CAMBIOS
+    cortos = {a['nombre']: a['corto'] for a in agencias}
+    workbook = libro_rapido(buffer)
+    for a in agencias:
+        escribir_hoja_cambios(workbook, cambios[a['nombre']], nombre_hoja_cambios(a), (a['corto'], cortos[a['foranea']]))
+    workbook.close()
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,182 @@
+import os
+import glob
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from compradia.config import CONFIG
+from compradia.indice import construir_indice, guardar_indice, indice_en_memoria, resumen_indice
+from compradia.perf import enviar, etapa, registrar
+from compradia.ventas import parsear_master_cronometrado, pool_parseo, reiniciar_pool_parseo, agregar_mensual, periodos_ventana
+
+# --- CACHÉ LOCAL DEL HISTÓRICO (PARQUET) ---
+# Cada MASTER se guarda en disco con la clave id de Drive + revisión (md5Checksum o modifiedTime):
+# 'crudo' = filas normalizadas, 'mensual' = agregado por (NP, PERIODO).
+# Si el archivo no cambió, no se descarga, no se parsea y no se vuelve a agregar.
+
+def ruta_cache_ventas(file_meta, tipo='crudo'):
+    revision = file_meta.get('md5Checksum') or file_meta.get('modifiedTime')
+    if not revision: return None
+    huella = hashlib.sha1(revision.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(CONFIG['cache_dir'], f"{file_meta['id']}_{huella}.{tipo}.parquet")
+
+def leer_cache_ventas(file_meta, tipo='crudo'):
+    ruta = ruta_cache_ventas(file_meta, tipo)
+    if not ruta or not os.path.exists(ruta): return None
+    try:
+        df = pd.read_parquet(ruta)
+        os.utime(ruta) # Marca de uso reciente para la expulsión
+        return df
+    except Exception: return None
+
+def guardar_cache_ventas(file_meta, df, tipo='crudo'):
+    ruta = ruta_cache_ventas(file_meta, tipo)
+    if not ruta: return
+    try:
+        os.makedirs(CONFIG['cache_dir'], exist_ok=True)
+        df_cache = df.copy()
+        for col in df_cache.columns:
+            if df_cache[col].dtype == object:
+                df_cache[col] = df_cache[col].where(df_cache[col].isna(), df_cache[col].astype(str))
+        # Revisiones anteriores del mismo archivo ya no sirven
+        for vieja in glob.glob(os.path.join(CONFIG['cache_dir'], f"{file_meta['id']}_*.{tipo}.parquet")):
+            if vieja != ruta: os.remove(vieja)
+        df_cache.to_parquet(ruta + ".tmp", index=False)
+        os.replace(ruta + ".tmp", ruta)
+        purgar_cache_ventas()
+    except Exception: pass
+
+def tamano_cache_ventas():
+    archivos = glob.glob(os.path.join(CONFIG['cache_dir'], "*.parquet"))
+    return len(archivos), sum(os.path.getsize(a) for a in archivos)
+
+def purgar_cache_ventas(max_bytes=None):
+    if max_bytes is None: max_bytes = CONFIG['cache_max_mb'] * 1024 * 1024
+    archivos = sorted(glob.glob(os.path.join(CONFIG['cache_dir'], "*.parquet")), key=os.path.getmtime)
+    total = sum(os.path.getsize(a) for a in archivos)
+    # Se expulsan primero los de uso menos reciente
+    while archivos and total > max_bytes:
+        viejo = archivos.pop(0)
+        total -= os.path.getsize(viejo)
+        os.remove(viejo)
+
+def limpiar_cache_ventas():
+    purgar_cache_ventas(max_bytes=0)
+    for listado in glob.glob(os.path.join(CONFIG['cache_dir'], "listado_*.json")): os.remove(listado)
+
+# Último listado de MASTER por agencia: permite calcular el histórico sin conexión con lo que ya está en caché
+def ruta_listado(agencia):
+    return os.path.join(CONFIG['cache_dir'], f"listado_{agencia}.json")
+
+def guardar_listado(agencia, files_metadata):
+    try:
+        os.makedirs(CONFIG['cache_dir'], exist_ok=True)
+        with open(ruta_listado(agencia) + ".tmp", 'w', encoding='utf-8') as f: json.dump(files_metadata, f)
+        os.replace(ruta_listado(agencia) + ".tmp", ruta_listado(agencia))
+    except Exception: pass
+
+def leer_listado(agencia):
+    try:
+        with open(ruta_listado(agencia), encoding='utf-8') as f: return json.load(f)
+    except Exception: return []
+
+# --- LOGICA BI (HISTÓRICO) ---
+
+def enviar_parseo(contenido, nombre_archivo):
+    try:
+        return pool_parseo().submit(parsear_master_cronometrado, contenido, nombre_archivo)
+    except Exception:
+        # Pool roto (p.ej. un worker murió): se recrea en la siguiente corrida y este archivo se parsea aquí
+        reiniciar_pool_parseo()
+        with ThreadPoolExecutor(max_workers=1) as pool_local:
+            return pool_local.submit(parsear_master_cronometrado, contenido, nombre_archivo)
+
+def parsear_al_llegar(descargas, files_metadata):
+    # {futuro de descarga: i} -> {i: (futuro del parseo, bytes)}; cada archivo entra al pool de parseo apenas llega
+    parseos = {}
+    for futuro in as_completed(descargas):
+        i = descargas[futuro]
+        content = futuro.result()
+        if content: parseos[i] = (enviar_parseo(content.getvalue(), files_metadata[i]['name']), content.getbuffer().nbytes)
+    return parseos
+
+def obtener_frames_ventas(files_metadata, sin_conexion=False):
+    # Caché primero; lo que falta se descarga en hilos y se parsea en procesos a medida que llega
+    dfs = [leer_cache_ventas(file_meta) for file_meta in files_metadata]
+    pendientes = [i for i, df in enumerate(dfs) if df is None]
+
+    if pendientes and not sin_conexion:
+        if CONFIG['drive_async']:
+            # Mismo contrato (futuro -> BytesIO o None), pero por el pool de conexiones de compradia.drive_async
+            from compradia.drive_async import enviar_descarga
+            parseos = parsear_al_llegar({enviar_descarga(files_metadata[i]['id']): i for i in pendientes}, files_metadata)
+        else:
+            from compradia.drive import descargar_archivo_drive
+            with ThreadPoolExecutor(max_workers=CONFIG['max_descargas']) as pool_descargas:
+                descargas = {enviar(pool_descargas, descargar_archivo_drive, files_metadata[i]['id']): i for i in pendientes}
+                parseos = parsear_al_llegar(descargas, files_metadata)
+        for i, (futuro, n_bytes) in parseos.items():
+            try:
+                df_temp, segundos = futuro.result()
+                registrar('historico.parseo', segundos, archivo=files_metadata[i]['name'], bytes_entrada=n_bytes,
+                          filas_salida=None if df_temp is None else len(df_temp))
+                if df_temp is not None:
+                    guardar_cache_ventas(files_metadata[i], df_temp)
+                    dfs[i] = df_temp
+            except Exception: pass
+    return dfs
+
+def obtener_agregado_mensual(agencia, meses=12, sin_conexion=False):
+    # sin_conexion: no se consulta Drive; se usa el último listado y solo lo que ya está en caché
+    periodo_inicio, periodo_fin = periodos_ventana(meses)
+    anios_drive = sorted(set(range(periodo_inicio // 100, periodo_fin // 100 + 1)))
+    if sin_conexion:
+        files_metadata = leer_listado(agencia.upper())
+    else:
+        from compradia.drive import buscar_archivos_ventas
+        files_metadata = buscar_archivos_ventas(agencia.upper(), anios_drive)
+        guardar_listado(agencia.upper(), files_metadata)
+
+    if not files_metadata: return None, periodo_inicio, periodo_fin
+
+    # Solo se re-agregan los meses de los archivos que cambiaron en Drive
+    agregados = [leer_cache_ventas(file_meta, 'mensual') for file_meta in files_metadata]
+    faltantes = [i for i, agg in enumerate(agregados) if agg is None]
+    if faltantes:
+        crudos = obtener_frames_ventas([files_metadata[i] for i in faltantes], sin_conexion)
+        for i, df_crudo in zip(faltantes, crudos):
+            if df_crudo is None: continue
+            with etapa('historico.agregado', archivo=files_metadata[i]['name'], filas_entrada=len(df_crudo)) as e:
+                agg = agregar_mensual(df_crudo)
+                e['filas_salida'] = None if agg is None else len(agg)
+            if agg is None: continue
+            guardar_cache_ventas(files_metadata[i], agg, 'mensual')
+            agregados[i] = agg
+
+    agregados = [agg for agg in agregados if agg is not None]
+    if not agregados: return None, periodo_inicio, periodo_fin
+    return pd.concat(agregados, ignore_index=True), periodo_inicio, periodo_fin
+
+def indice_agencia(agencia, sin_conexion=False, reconstruir=False, horizontes=()):
+    # Índice de N° PARTE del histórico (ver compradia.indice); se reutiliza el de la última corrida si es de la misma ventana
+    # horizontes: otras ventanas en meses (p.ej. (3, 6)) que se calculan en la misma pasada que la de 12
+    p_inicio, p_fin = periodos_ventana(12)
+    indice = None if reconstruir else indice_en_memoria(agencia, p_inicio, p_fin, horizontes)
+    if indice is not None: return indice
+    with etapa('historico', agencia=agencia, horizontes=list(horizontes)) as e:
+        agregado, _, p_fin = obtener_agregado_mensual(agencia, max((12, *horizontes)), sin_conexion=sin_conexion)
+        if agregado is None: return None
+        e['filas_entrada'] = len(agregado)
+        with etapa('historico.indice', agencia=agencia, filas_entrada=len(agregado)) as ei:
+            indice = construir_indice(agregado, p_inicio, p_fin, meses=12, horizontes=horizontes)
+            ei['filas_salida'] = len(indice['nps'])
+        guardar_indice(agencia, indice)
+        e['filas_salida'] = int(indice['en_ventana'].sum())
+    return indice
+
+def calcular_bi_historico(agencia, sin_conexion=False, horizontes=()):
+    # En cada corrida se vuelve a consultar Drive; el índice que queda sirve al MODO DETECTIVE
+    indice = indice_agencia(agencia, sin_conexion, reconstruir=True, horizontes=horizontes)
+    if indice is None: return None
+    resumen = resumen_indice(indice, horizontes)
+    return resumen if len(resumen) else None
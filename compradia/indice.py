@@ -0,0 +1,112 @@
+import time
+import threading
+import numpy as np
+import pandas as pd
+from compradia.ventas import resumir_horizontes
+
+# Índice por agencia de N° PARTE -> sus filas mensuales (PERIODO, EVENTOS, NEGATIVOS, CANTIDAD) y su HITS/PROMEDIO.
+# Las filas quedan ordenadas por (NP, PERIODO) y cada NP apunta a su rango [inicio, fin): una consulta es una
+# búsqueda binaria (np.searchsorted), igual para un NP, un lote de NPs o un prefijo.
+# Se arma en cada corrida completa y queda en memoria del proceso (sobrevive a los reruns de Streamlit).
+
+_indices = {}
+_lock_indices = threading.Lock()
+
+def construir_indice(agregado, p_inicio, p_fin, meses=12, horizontes=()):
+    # Un MASTER por año puede repetir (NP, PERIODO) con otro archivo: se suman igual que en resumir_ventana.
+    # Ese único groupby da la serie mensual de cada NP y de ella salen todos los horizontes (compradia.ventas)
+    tabla = agregado.groupby(['NP', 'PERIODO'], as_index=False, sort=True)[['EVENTOS', 'NEGATIVOS', 'CANTIDAD']].sum()
+    nps_filas = tabla['NP'].to_numpy(dtype=str)
+    cortes = np.flatnonzero(nps_filas[1:] != nps_filas[:-1]) + 1
+    inicios = np.concatenate(([0], cortes)) if len(nps_filas) else np.array([], dtype=np.int64)
+    nps = nps_filas[inicios]
+    fines = np.append(inicios[1:], len(nps_filas))
+
+    grupos = np.repeat(np.arange(len(nps)), fines - inicios)
+    metricas = resumir_horizontes(grupos, len(nps), tabla['PERIODO'].to_numpy(), tabla['EVENTOS'].to_numpy(),
+                                  tabla['NEGATIVOS'].to_numpy(), tabla['CANTIDAD'].to_numpy(), p_fin, (meses, *horizontes))
+    hits, promedio, en_ventana = metricas[meses]
+    return {
+        'nps': nps, 'inicios': inicios, 'fines': fines,
+        'periodo': tabla['PERIODO'].to_numpy(), 'eventos': tabla['EVENTOS'].to_numpy(),
+        'negativos': tabla['NEGATIVOS'].to_numpy(), 'cantidad': tabla['CANTIDAD'].to_numpy(),
+        'hits': hits, 'promedio': promedio, 'en_ventana': en_ventana,
+        'horizontes': {h: metricas[h] for h in horizontes},
+        'p_inicio': p_inicio, 'p_fin': p_fin, 'meses': meses, 'creado': time.time(),
+    }
+
+def resumen_indice(indice, horizontes=()):
+    # Mismo resultado que resumir_ventana (los NP con ventas en la ventana) más HITS_CALCULADO_3M, PROMEDIO_CALCULADO_3M...
+    # por cada horizonte pedido; un NP con ventas solo en un horizonte más largo entra con 0 en los demás
+    m = indice['en_ventana'].copy()
+    for h in horizontes: m |= indice['horizontes'][h][2]
+    resumen = {'NP': indice['nps'][m].astype(object), 'HITS_CALCULADO': indice['hits'][m],
+               'PROMEDIO_CALCULADO': indice['promedio'][m]}
+    for h in horizontes:
+        hits, promedio, _ = indice['horizontes'][h]
+        resumen[f'HITS_CALCULADO_{h}M'], resumen[f'PROMEDIO_CALCULADO_{h}M'] = hits[m], promedio[m]
+    return pd.DataFrame(resumen)
+
+def guardar_indice(agencia, indice):
+    with _lock_indices: _indices[agencia] = indice
+
+def indice_en_memoria(agencia, p_inicio=None, p_fin=None, horizontes=()):
+    with _lock_indices: indice = _indices.get(agencia)
+    if indice is None: return None
+    if p_inicio is not None and (indice['p_inicio'], indice['p_fin']) != (p_inicio, p_fin): return None
+    if not set(horizontes) <= set(indice['horizontes']): return None
+    return indice
+
+def olvidar_indices():
+    with _lock_indices: _indices.clear()
+
+def _normalizar(nps):
+    return np.array([str(n).strip() for n in nps], dtype=str)
+
+def posiciones(indice, nps):
+    # Posición de cada NP en el índice; -1 si no existe
+    buscados = _normalizar(nps)
+    if len(indice['nps']) == 0: return np.full(len(buscados), -1)
+    pos = np.searchsorted(indice['nps'], buscados)
+    pos_validas = np.minimum(pos, len(indice['nps']) - 1)
+    return np.where(indice['nps'][pos_validas] == buscados, pos_validas, -1)
+
+def consultar_lote(indice, nps):
+    buscados = _normalizar(nps)
+    pos = posiciones(indice, buscados)
+    encontrado = pos >= 0
+    p = pos[encontrado]
+    hits, promedio, meses = np.zeros(len(buscados), dtype=np.int64), np.zeros(len(buscados)), np.zeros(len(buscados), dtype=np.int64)
+    hits[encontrado] = indice['hits'][p]
+    promedio[encontrado] = indice['promedio'][p]
+    meses[encontrado] = indice['fines'][p] - indice['inicios'][p]
+    return pd.DataFrame({'NP': buscados.astype(object), 'HITS': hits, 'PROMEDIO': promedio,
+                         'MESES CON REGISTRO': meses, 'EN HISTÓRICO': encontrado})
+
+def consultar_prefijo(indice, prefijo, limite=200):
+    # Todos los NP que empiezan con el prefijo: es el rango [prefijo, prefijo + '\U0010ffff') del arreglo ordenado
+    prefijo = str(prefijo).strip()
+    desde = np.searchsorted(indice['nps'], prefijo, side='left')
+    hasta = np.searchsorted(indice['nps'], prefijo + '\U0010ffff', side='left')
+    return consultar_lote(indice, indice['nps'][desde:min(hasta, desde + limite)]), int(hasta - desde)
+
+def detalle_mensual(indice, np_buscado):
+    # Todos los meses de la ventana (con 0 donde no hubo venta) y el aporte de cada uno a HITS y PROMEDIO.
+    # Las filas con MES no reconocido (PERIODO = AAAA00) también cuentan en HITS/PROMEDIO si caen en la ventana:
+    # van al final como "MES NO RECONOCIDO (AAAA)" para que la tabla sume lo mismo que el resumen
+    pos = posiciones(indice, [np_buscado])[0]
+    if pos < 0: return None
+    i, f = indice['inicios'][pos], indice['fines'][pos]
+    filas = pd.DataFrame({'PERIODO': indice['periodo'][i:f], 'EVENTOS': indice['eventos'][i:f],
+                          'NEGATIVOS': indice['negativos'][i:f], 'CANTIDAD': indice['cantidad'][i:f]})
+    meses = pd.period_range(pd.Period(year=indice['p_inicio'] // 100, month=indice['p_inicio'] % 100, freq='M'),
+                            periods=indice['meses'], freq='M')
+    periodos = meses.year * 100 + meses.month
+    detalle = filas.set_index('PERIODO').reindex(periodos, fill_value=0).rename_axis('PERIODO').reset_index()
+    sin_mes = filas[(filas['PERIODO'] % 100 == 0) & (filas['PERIODO'] >= indice['p_inicio']) & (filas['PERIODO'] < indice['p_fin'])]
+    if len(sin_mes):
+        sin_mes = sin_mes.assign(PERIODO=[f"MES NO RECONOCIDO ({p // 100})" for p in sin_mes['PERIODO']])
+        detalle = pd.concat([detalle.astype({'PERIODO': str}), sin_mes], ignore_index=True)
+    detalle['HITS DEL MES'] = detalle['EVENTOS'] - 2 * detalle['NEGATIVOS']
+    detalle['APORTE PROMEDIO'] = detalle['CANTIDAD'] / indice['meses']
+    return detalle
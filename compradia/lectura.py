@@ -0,0 +1,138 @@
+import io
+import math
+import datetime
+import numpy as np
+from pandas._libs.parsers import STR_NA_VALUES
+from pandas.io.parsers import TextParser
+
+# Lector de Excel por streaming: solo convierte las columnas pedidas y descarta filas mientras lee.
+# Replica la conversión de celdas de pd.read_excel(header=None) y su inferencia de tipos, que se hace
+# sobre la columna COMPLETA: por cada columna se guarda un "testigo" de cada tipo de valor visto en
+# las filas descartadas y se agrega al final, para que el resultado (valores y dtypes) sea el mismo.
+# Usa partes privadas de pandas (versión acotada en requirements.txt): al cambiar de versión, correr
+# python -m benchmarks.equivalencias, que lo compara contra pd.read_excel en .xlsx y .xls desordenados.
+
+def _valor_openpyxl(celda):
+    # Igual que pandas (_openpyxl.py: _convert_cell)
+    if celda.value is None: return ""
+    if celda.data_type == 'e': return np.nan
+    if celda.data_type == 'n':
+        val = int(celda.value)
+        if val == celda.value: return val
+        return float(celda.value)
+    return celda.value
+
+def _valor_xlrd(valor, tipo, epoch1904):
+    # Igual que pandas (_xlrd.py: _parse_cell)
+    from xlrd import XL_CELL_BOOLEAN, XL_CELL_DATE, XL_CELL_ERROR, XL_CELL_NUMBER, xldate
+    if tipo == XL_CELL_DATE:
+        try: valor = xldate.xldate_as_datetime(valor, epoch1904)
+        except OverflowError: return valor
+        anio = valor.timetuple()[0:3]
+        if (not epoch1904 and anio == (1899, 12, 31)) or (epoch1904 and anio == (1904, 1, 1)):
+            valor = datetime.time(valor.hour, valor.minute, valor.second, valor.microsecond)
+    elif tipo == XL_CELL_ERROR: valor = np.nan
+    elif tipo == XL_CELL_BOOLEAN: valor = bool(valor)
+    elif tipo == XL_CELL_NUMBER:
+        if math.isfinite(valor):
+            val = int(valor)
+            if val == valor: valor = val
+    return valor
+
+def _filas_openpyxl(contenido, columnas):
+    import openpyxl
+    libro = openpyxl.load_workbook(io.BytesIO(contenido), read_only=True, data_only=True, keep_links=False)
+    try:
+        hoja = libro.worksheets[0]
+        hoja.reset_dimensions()
+        for fila in hoja.rows:
+            n = len(fila)
+            tiene_datos = lambda fila=fila: any(celda.value is not None for celda in fila)
+            yield n, [_valor_openpyxl(fila[c]) if c < n else "" for c in columnas], tiene_datos
+    finally:
+        libro.close()
+
+def _filas_xlrd(contenido, columnas):
+    import xlrd
+    libro = xlrd.open_workbook(file_contents=contenido, on_demand=True)
+    try:
+        hoja = libro.sheet_by_index(0)
+        # pandas no recorta filas vacías en .xls: toda fila cuenta como fila con datos
+        tiene_datos = lambda: True
+        for r in range(hoja.nrows):
+            n = hoja.row_len(r)
+            yield hoja.ncols, [
+                _valor_xlrd(hoja.cell_value(r, c), hoja.cell_type(r, c), libro.datemode) if c < n else ""
+                for c in columnas
+            ], tiene_datos
+    finally:
+        libro.release_resources()
+
+def _tipo_valor(valor):
+    # Clases de valor que deciden el dtype que infiere pandas para la columna
+    if valor == "" or (isinstance(valor, float) and math.isnan(valor)): return 'na'
+    if isinstance(valor, str):
+        if valor in STR_NA_VALUES: return 'na'
+        try: float(valor)
+        except ValueError: return 'texto'
+        return 'texto_numerico'
+    if isinstance(valor, float): return 'float'
+    return type(valor).__name__
+
+def leer_excel_proyectado(archivo, columnas, filtro=None, engine=None):
+    # columnas: posiciones a conservar; filtro: (posición, función(valor) -> bool) aplicado al leer
+    contenido = archivo.getvalue() if hasattr(archivo, 'getvalue') else archivo.read()
+    if engine is None: engine = 'xlrd' if getattr(archivo, 'name', '').endswith('.xls') else 'openpyxl'
+    filas = _filas_xlrd(contenido, columnas) if engine == 'xlrd' else _filas_openpyxl(contenido, columnas)
+    pos_filtro = columnas.index(filtro[0]) if filtro else None
+
+    indices, datos = [], []
+    testigos = [{} for _ in columnas]
+    pendientes = [None] * len(columnas) # Testigos 'na' de filas vacías: pandas recorta las vacías del final
+    ancho = 0
+    fin_datos = 0 # Sin filtro: filas hasta la última con datos (pandas recorta las vacías del final)
+    for i, (n, valores, tiene_datos) in enumerate(filas):
+        ancho = max(ancho, n)
+        if filtro is None or filtro[1](valores[pos_filtro]):
+            indices.append(i)
+            datos.append(valores)
+            if filtro is None and tiene_datos(): fin_datos = len(datos)
+            for k, pendiente in enumerate(pendientes):
+                if pendiente is not None: testigos[k]['na'] = pendiente
+            pendientes = [None] * len(columnas)
+            continue
+        fila_con_datos = None
+        for k, valor in enumerate(valores):
+            tipo = _tipo_valor(valor)
+            if tipo in testigos[k]: continue
+            if tipo == 'na':
+                if fila_con_datos is None: fila_con_datos = tiene_datos()
+                if not fila_con_datos:
+                    if pendientes[k] is None: pendientes[k] = valor
+                    continue
+            testigos[k][tipo] = valor
+        if any(p is not None for p in pendientes):
+            if fila_con_datos is None: fila_con_datos = tiene_datos()
+            if fila_con_datos:
+                for k, pendiente in enumerate(pendientes):
+                    if pendiente is not None: testigos[k].setdefault('na', pendiente)
+                pendientes = [None] * len(columnas)
+
+    if filtro is None: del indices[fin_datos:], datos[fin_datos:]
+    if max(columnas) >= ancho:
+        raise IndexError(f"La hoja tiene {ancho} columnas; se pidió la columna {max(columnas)}")
+
+    # Sin filas conservadas la plantilla sale de los mismos testigos: el DataFrame vacío lleva los dtypes de pandas
+    plantilla = datos[0] if datos else [next(iter(por_tipo.values())) for por_tipo in testigos] if all(testigos) else None
+    extra = []
+    if plantilla is not None:
+        for k, por_tipo in enumerate(testigos):
+            for valor in por_tipo.values():
+                fila = list(plantilla)
+                fila[k] = valor
+                extra.append(fila)
+    df = TextParser(datos + extra if extra or datos else [list(columnas)], header=None, skip_blank_lines=False).read()
+    df = df.iloc[:len(datos)]
+    df.columns = columnas
+    df.index = np.asarray(indices, dtype=np.int64)
+    return df
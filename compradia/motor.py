@@ -0,0 +1,181 @@
+import numpy as np
+import pandas as pd
+
+COLS_TRANSITO = ["N° PARTE", "TRANSITO"]
+COLS_TRASPASO = ["N° PARTE", "CANTIDAD_TRASPASO"]
+
+def columnas_hoja(agencia, foranea):
+    return [agencia['col_parte'], "SUGERIDO DIA", "POR FINCAR", "(Consumo Mensual / 2) - Inv Tran", "EXISTENCIA",
+            "FECHA DE ULTIMA COMPRA", f"PROMEDIO {agencia['nombre']}", "HITS", "CONSUMO MENSUAL", "2",
+            f"INVENTARIO {foranea['nombre']}", f"PROMEDIO {foranea['nombre']}", "HITS_FORANEO", agencia['col_traspaso'],
+            "NUEVO TRASPASO", "CANTIDAD A TRASPASAR", f"Fec ult Comp {foranea['corto']}", "TRANSITO", "INV. TOTAL",
+            "MESES VENTA ACTUAL", "MESES VENTA SUGERIDO", "Line Value", "Cycle Count", "Status", "Ship Multiple",
+            "Last 12 Month Demand", "Current Month Demand", "Job Quantity", "Full Bin", "Bin Location",
+            "Dealer On Hand", "Stock on Order", "Stock On Back Order", "Reason Code"]
+
+def columnas_horizontes(agencia, indices):
+    # Columnas opcionales de HITS / PROMEDIO a otros horizontes (HITS 3M CUAUTITLAN...); van después de "Reason Code"
+    pieza = indices[agencia['nombre']]['horizontes']
+    return [] if pieza is None else list(nombres_horizontes(agencia, pieza.columns).values())
+
+def nombres_horizontes(agencia, columnas):
+    # HITS_CALCULADO_3M -> HITS 3M CUAUTITLAN
+    return {c: f"{c.replace('_CALCULADO_', ' ')} {agencia['nombre']}" for c in columnas}
+
+def columnas_sugerido(agencias):
+    # Lo que el reporte toma del Sugerido: las columnas de las hojas más las que se usan para calcular
+    por_nombre = {a['nombre']: a for a in agencias}
+    columnas = {"N° PARTE", "Last 12 Month Demand"}
+    for a in agencias: columnas.update(columnas_hoja(a, por_nombre[a['foranea']]))
+    return tuple(sorted(columnas))
+
+def nombre_hoja(agencia):
+    return f"DIA {agencia['nombre']}"
+
+def nombre_hoja_cambios(agencia):
+    return f"CAMBIOS {agencia['nombre']}"[:31]
+
+def completar_y_ordenar(df, lista_columnas_deseadas):
+    # Las columnas que faltan van como int8 en 0; solo se rellenan las que de verdad traen vacíos
+    for col in lista_columnas_deseadas:
+        if col not in df.columns: df[col] = np.zeros(len(df), dtype=np.int8)
+    df = df[lista_columnas_deseadas]
+    for i in range(df.shape[1]):
+        serie = df.iloc[:, i]
+        if not serie.hasnans: continue
+        if isinstance(serie.dtype, pd.CategoricalDtype) and 0 not in serie.cat.categories: serie = serie.cat.add_categories([0])
+        if serie.dtype == object:
+            # fillna ya no baja el tipo de object (FutureWarning en pandas 2.2): se rellena y se infiere explícitamente
+            serie = pd.Series(np.where(serie.isna(), 0, serie), index=serie.index, name=serie.name, dtype=object)
+            df.isetitem(i, serie.infer_objects(copy=False))
+        else: df.isetitem(i, serie.fillna(0))
+    return df
+
+# --- REPRESENTACIÓN COMPACTA ---
+# Los números de parte de todas las entradas comparten un solo diccionario (categorías) y los cruces se hacen
+# sobre su código int32. Los enteros van al tipo más chico que alcance, y también las columnas float sin vacíos
+# cuyos valores son todos enteros (p.ej. cantidades leídas como 3.0): el valor no cambia, así que las fórmulas
+# dan lo mismo. Un float con decimales o con vacíos se queda como está. El texto repetido (fechas, estatus,
+# ubicaciones) va como categoría.
+
+def compactar(df, excluir=("N° PARTE",)):
+    if df is None: return None
+    for i, col in enumerate(df.columns):
+        if col in excluir: continue
+        serie = df.iloc[:, i]
+        tipo = serie.dtype
+        if tipo.kind in 'iu' or (tipo.kind == 'f' and len(serie) and not serie.hasnans and (serie % 1 == 0).all()):
+            df.isetitem(i, pd.to_numeric(serie, downcast='integer'))
+        elif (tipo == object or isinstance(tipo, pd.StringDtype)) and serie.nunique() <= len(serie) // 2:
+            df.isetitem(i, serie.astype('category'))
+    return df
+
+def diccionario_partes(frames):
+    # Todos los N° PARTE de todas las entradas, sin repetir: la posición en las categorías es el código
+    claves = [df["N° PARTE"] for df in frames if df is not None and "N° PARTE" in df.columns]
+    if not claves: return pd.CategoricalDtype(pd.Index([], dtype=str))
+    return pd.CategoricalDtype(pd.concat(claves, ignore_index=True).unique())
+
+def codigos_partes(partes, serie):
+    return partes.categories.get_indexer(serie).astype(np.int32)
+
+# --- FÓRMULAS DIA EN PANDAS ---
+# Mismas reglas que las fórmulas del Excel (FORMULAS_DIA), por posición de columna.
+
+def numeros_excel(serie):
+    # Como opera Excel con + - /: vacío = 0, texto numérico se convierte, otro texto = error (NaN)
+    valores = pd.to_numeric(serie, errors='coerce')
+    return valores.where(serie.notna(), 0).to_numpy(dtype=float)
+
+def numeros_en_referencia(serie):
+    # MIN() sobre referencias ignora texto, lógicos y vacíos
+    if serie.dtype.kind in 'iuf': return serie.to_numpy(dtype=float)
+    es_numero = serie.map(lambda v: isinstance(v, (int, float)) and not isinstance(v, bool))
+    return pd.to_numeric(serie.where(es_numero), errors='coerce').to_numpy(dtype=float)
+
+def calcular_formulas_dia(df):
+    # Columnas por posición: B, E, I, J, P, R. NaN = la fórmula daría #VALUE! en Excel.
+    B, E, I, J, P, R = (numeros_excel(df.iloc[:, c]) for c in (1, 4, 8, 9, 15, 17))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        divisor = np.where(I == 0, np.nan, I)
+        inv_total = R + E + P
+        razon_1 = (B + inv_total + P) / divisor
+        razon_2 = (R + E) / divisor
+        minimo = np.fmin(numeros_en_referencia(df.iloc[:, 8]), numeros_en_referencia(df.iloc[:, 1]))
+        minimo = np.where(np.isnan(minimo), 0, minimo)
+        rama_2 = np.where(np.isnan(razon_2), 0, np.where(razon_2 > 3, 0, B - P))
+        por_fincar = np.where(np.isnan(razon_1), 0, np.where(razon_1 > 1.5, minimo, rama_2))
+        meses_actual = np.nan_to_num(inv_total / divisor, nan=0.0)
+        meses_sugerido = np.nan_to_num((por_fincar + inv_total + P) / divisor, nan=0.0)
+    return {2: por_fincar, 3: J - inv_total, 18: inv_total, 19: meses_actual, 20: meses_sugerido}
+
+def aplicar_formulas_dia(df):
+    # Deja en el DataFrame los valores que mostrarán las fórmulas (se usan como valor en caché del Excel)
+    for col, valores in calcular_formulas_dia(df).items():
+        df.isetitem(col, valores)
+    return df
+
+# --- MOTOR DE HOJAS ---
+
+def indexar(df, columnas, partes):
+    # Se indexa una sola vez por entrada, por código de N° PARTE (df[columnas] copia solo esas columnas, ya compactas).
+    # Sin copy-on-write, el rename de cada hoja también copia: ~2 MB por hoja con 100k partes, sin cambio en el pico
+    # de la etapa (el join copia de todos modos); rename(copy=False) no vale la pena y el argumento se va en pandas 3
+    if df is None: return None
+    return df[columnas].set_axis(codigos_partes(partes, df["N° PARTE"]))
+
+def indexar_entradas(entradas):
+    # entradas[nombre] = {'base', 'bi', 'inv', 'trans', 'trasp'} ya cargadas
+    bis = {nombre: e.get('bi') for nombre, e in entradas.items()}
+    bis = {nombre: None if bi is None else compactar(bi.rename(columns={'NP': 'N° PARTE'})) for nombre, bi in bis.items()}
+    partes = diccionario_partes([bis[nombre] for nombre in entradas] +
+                                [e.get(k) for e in entradas.values() for k in ('base', 'inv', 'trans', 'trasp')])
+    indices = {'partes': partes}
+    for nombre, e in entradas.items():
+        extra = [c for c in bis[nombre].columns if c.startswith(('HITS_CALCULADO_', 'PROMEDIO_CALCULADO_'))] if bis[nombre] is not None else []
+        indices[nombre] = {
+            'bi': indexar(bis[nombre], ['HITS_CALCULADO', 'PROMEDIO_CALCULADO'], partes),
+            'horizontes': indexar(bis[nombre], extra, partes) if extra else None,
+            'inv': indexar(e.get('inv'), ['EXIST', 'FEC ULT COMP'], partes),
+            'trans': indexar(e.get('trans'), ['TRANSITO'], partes),
+            'trasp': indexar(e.get('trasp'), ['CANTIDAD_TRASPASO'], partes),
+        }
+    return indices
+
+def piezas_hoja(agencia, foranea, indices):
+    # (entrada indexada o None, renombres) de todo lo que se cruza con la base de la agencia
+    local, ajena = indices[agencia['nombre']], indices[foranea['nombre']]
+    return [
+        (local['bi'], {'HITS_CALCULADO': 'HITS', 'PROMEDIO_CALCULADO': f"PROMEDIO {agencia['nombre']}"}),
+        (ajena['bi'], {'HITS_CALCULADO': 'HITS_FORANEO', 'PROMEDIO_CALCULADO': f"PROMEDIO {foranea['nombre']}"}),
+        (local['inv'], {'EXIST': 'EXISTENCIA', 'FEC ULT COMP': 'FECHA DE ULTIMA COMPRA'}),
+        (ajena['inv'], {'EXIST': f"INVENTARIO {foranea['nombre']}", 'FEC ULT COMP': f"Fec ult Comp {foranea['corto']}"}),
+        (local['trans'], {}),
+        (local['trasp'], {'CANTIDAD_TRASPASO': agencia['col_traspaso']}),
+        (local['horizontes'], {} if local['horizontes'] is None else nombres_horizontes(agencia, local['horizontes'].columns)),
+    ]
+
+def construir_hoja(agencia, foranea, base, indices):
+    piezas = [pieza.rename(columns=nombres) for pieza, nombres in piezas_hoja(agencia, foranea, indices) if pieza is not None]
+
+    # Un solo cruce por código de N° PARTE; las columnas que trae el cruce reemplazan a las de la base
+    partes = indices['partes']
+    traidas = {col for pieza in piezas for col in pieza.columns}
+    final = base.drop(columns=[c for c in base.columns if c in traidas or c in ("N° PARTE", agencia['col_parte'])])
+    final = final.set_axis(codigos_partes(partes, base["N° PARTE"])).join(piezas, how='left')
+
+    final.insert(0, agencia['col_parte'], pd.Categorical.from_codes(final.index.to_numpy(), dtype=partes))
+    final = final.reset_index(drop=True)
+    final = completar_y_ordenar(final, columnas_hoja(agencia, foranea) + columnas_horizontes(agencia, indices))
+    aplicar_formulas_dia(final)
+    return final.rename(columns={'HITS_FORANEO': 'HITS'})
+
+def construir_hojas(agencias, entradas, pool=None):
+    # Devuelve {nombre_agencia: DataFrame de exportación}; las hojas son independientes y se arman en paralelo
+    por_nombre = {a['nombre']: a for a in agencias}
+    indices = indexar_entradas(entradas)
+    tareas = {a['nombre']: (a, por_nombre[a['foranea']], entradas[a['nombre']]['base'], indices) for a in agencias}
+    if pool is None:
+        return {nombre: construir_hoja(*args) for nombre, args in tareas.items()}
+    futuros = {nombre: pool.submit(construir_hoja, *args) for nombre, args in tareas.items()}
+    return {nombre: futuro.result() for nombre, futuro in futuros.items()}
@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import datetime
+import threading
+import contextvars
+import tracemalloc
+from contextlib import contextmanager
+
+# Registro de rendimiento por etapa: tiempo, memoria, filas de entrada/salida y bytes de Drive.
+# Cada corrida tiene su propio registro (Corrida): iniciar_corrida() lo crea y lo deja activo en el contexto
+# actual (contextvars), así dos sesiones de Streamlit que procesan a la vez no se mezclan ni se borran.
+# Las etapas se marcan con `with etapa(...) as e:` y los datos que solo se conocen al final
+# (filas_salida, bytes...) se agregan al dict e. Los hilos de un ThreadPoolExecutor no heredan el contexto:
+# las tareas que marcan etapas se mandan con enviar(pool, funcion, *args).
+# Memoria: siempre se toma el RSS del proceso (barato). Con memoria_detallada=True se usa además
+# tracemalloc para el pico de cada etapa (más preciso, pero hace todo bastante más lento).
+
+class Corrida:
+    def __init__(self, memoria_detallada=False):
+        self.inicio = time.perf_counter()
+        self.memoria_detallada = memoria_detallada
+        self._eventos = []
+        self._lock = threading.Lock()
+
+    def agregar(self, evento):
+        with self._lock: self._eventos.append(evento)
+
+    def eventos(self):
+        with self._lock: return list(self._eventos)
+
+_corrida = contextvars.ContextVar('corrida', default=None)
+
+# tracemalloc es uno solo por proceso: se enciende con la primera corrida que lo pide y se apaga con la última
+_lock_tracemalloc = threading.Lock()
+_corridas_tracemalloc = 0
+_tracemalloc_propio = False
+_etapas_abiertas = 0
+
+def rss_mb():
+    # Memoria residente actual (Linux); None si no se puede leer
+    try:
+        with open('/proc/self/statm') as f: paginas = int(f.read().split()[1])
+        return round(paginas * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024, 1)
+    except Exception: return None
+
+def pico_rss_mb():
+    # Máximo histórico del proceso (ru_maxrss viene en KB en Linux)
+    try:
+        import resource
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except Exception: return None
+
+def corrida_actual():
+    return _corrida.get()
+
+def fijar_corrida(corrida):
+    # Para contextos que no heredan el de quien inició la corrida (p.ej. el event loop de compradia.drive_async)
+    _corrida.set(corrida)
+
+def enviar(pool, funcion, *args, **kwargs):
+    # pool.submit con una copia del contexto actual: las etapas del hilo de trabajo van a la misma corrida
+    return pool.submit(contextvars.copy_context().run, funcion, *args, **kwargs)
+
+def iniciar_corrida(memoria_detallada=False):
+    global _corridas_tracemalloc, _tracemalloc_propio
+    corrida = Corrida(memoria_detallada)
+    _corrida.set(corrida)
+    if memoria_detallada:
+        with _lock_tracemalloc:
+            _corridas_tracemalloc += 1
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracemalloc_propio = True
+    return corrida
+
+def terminar_corrida(corrida=None):
+    global _corridas_tracemalloc, _tracemalloc_propio
+    corrida = corrida or _corrida.get()
+    if corrida is None: return []
+    if corrida.memoria_detallada:
+        with _lock_tracemalloc:
+            _corridas_tracemalloc -= 1
+            if _corridas_tracemalloc == 0 and _tracemalloc_propio:
+                tracemalloc.stop()
+                _tracemalloc_propio = False
+        corrida.memoria_detallada = False
+    if _corrida.get() is corrida: _corrida.set(None)
+    return corrida.eventos()
+
+def eventos():
+    corrida = _corrida.get()
+    return [] if corrida is None else corrida.eventos()
+
+def registrar(nombre, segundos, **datos):
+    # Para mediciones hechas en otro lado (p.ej. dentro de un proceso del pool de parseo)
+    evento = {'etapa': nombre, 'segundos': round(segundos, 4), 'hilo': threading.current_thread().name, **datos}
+    corrida = _corrida.get()
+    if corrida is not None: corrida.agregar(evento)
+    return evento
+
+@contextmanager
+def etapa(nombre, **datos):
+    global _etapas_abiertas
+    evento = dict(datos)
+    rss_inicio = rss_mb()
+    corrida = _corrida.get()
+    usar_tracemalloc = tracemalloc.is_tracing()
+    if usar_tracemalloc:
+        with _lock_tracemalloc:
+            # El pico de tracemalloc es global: solo se reinicia si no hay otra etapa abierta
+            if _etapas_abiertas == 0: tracemalloc.reset_peak()
+            _etapas_abiertas += 1
+        memoria_inicio = tracemalloc.get_traced_memory()[0]
+    inicio = time.perf_counter()
+    try:
+        yield evento
+    except Exception as e:
+        evento['error'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        segundos = time.perf_counter() - inicio
+        if corrida is not None: evento['inicio_s'] = round(inicio - corrida.inicio, 4)
+        rss_fin = rss_mb()
+        evento['rss_mb'] = rss_fin
+        if rss_inicio is not None and rss_fin is not None: evento['rss_delta_mb'] = round(rss_fin - rss_inicio, 1)
+        evento['pico_rss_mb'] = pico_rss_mb()
+        if usar_tracemalloc:
+            if tracemalloc.is_tracing():
+                evento['pico_tracemalloc_mb'] = round((tracemalloc.get_traced_memory()[1] - memoria_inicio) / 1024 / 1024, 1)
+            with _lock_tracemalloc: _etapas_abiertas -= 1
+        registrar(nombre, segundos, **evento)
+
+def resumen(lista=None):
+    # Totales por etapa (sin el sufijo de agencia/archivo), para comparar corridas
+    totales = {}
+    for ev in (eventos() if lista is None else lista):
+        t = totales.setdefault(ev['etapa'], {'etapa': ev['etapa'], 'veces': 0, 'segundos': 0.0})
+        t['veces'] += 1
+        t['segundos'] = round(t['segundos'] + ev['segundos'], 4)
+        for clave in ('filas_entrada', 'filas_salida', 'bytes_descargados', 'bytes_subidos', 'bytes_salida'):
+            if ev.get(clave) is not None: t[clave] = t.get(clave, 0) + ev[clave]
+        if ev.get('pico_tracemalloc_mb') is not None: t['pico_tracemalloc_mb'] = max(t.get('pico_tracemalloc_mb', 0), ev['pico_tracemalloc_mb'])
+    return list(totales.values())
+
+def guardar_log(lista, ruta, **contexto):
+    # Una línea JSON por corrida (JSON Lines): fácil de comparar día contra día
+    try:
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        registro = {'fecha': datetime.datetime.now().isoformat(timespec='seconds'), **contexto,
+                    'pico_rss_mb': pico_rss_mb(), 'resumen': resumen(lista), 'etapas': lista}
+        with open(ruta, 'a', encoding='utf-8') as f: f.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+        return ruta
+    except Exception: return None
@@ -0,0 +1,86 @@
+import io
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from compradia.cargas import cargar_con_cache
+from compradia.entradas import limpiar_inventario, cargar_base_sugerido, procesar_transito, procesar_traspasos
+from compradia.delta import construir_hojas_delta
+from compradia.motor import COLS_TRANSITO, COLS_TRASPASO, columnas_sugerido, construir_hojas
+from compradia.perf import enviar, etapa
+
+# --- PIPELINE COMPLETO (SIN INTERFAZ) ---
+# La usan la app de Streamlit y la línea de comandos (python -m compradia run).
+# archivos = {'sug': {agencia: archivo}, 'trans': {...}, 'sit': {...}, 'inv': {...}}; tránsito y situación son opcionales.
+
+TIPOS_ARCHIVO = ['sug', 'trans', 'sit', 'inv']
+
+def nombre_reporte(fecha=None):
+    fecha = fecha or datetime.datetime.now()
+    return f"Analisis_Compras_{fecha.strftime('%d_%m_%Y_%H%M')}.xlsx"
+
+def faltantes(agencias, archivos):
+    # Sugerido e inventario son obligatorios para cada agencia
+    return [(tipo, a) for tipo in ('sug', 'inv') for a in agencias if not archivos[tipo].get(a['nombre'])]
+
+def cargar_medido(tipo, agencia, cargador, archivo, *params):
+    with etapa(f'entrada.{tipo}', agencia=agencia, archivo=getattr(archivo, 'name', None),
+               bytes_entrada=archivo.getbuffer().nbytes if hasattr(archivo, 'getbuffer') else None) as e:
+        df = cargar_con_cache(cargador, archivo, *params)
+        e['filas_salida'] = None if df is None else len(df)
+    return df
+
+def cargar_entradas(agencias, archivos, bi_por_agencia):
+    # Cada archivo se carga una sola vez y lo comparten todas las hojas;
+    # un archivo ya procesado en una corrida anterior se toma de la caché en memoria
+    entradas = {}
+    columnas = columnas_sugerido(agencias)
+    for a in agencias:
+        nombre = a['nombre']
+        trans, sit = archivos['trans'].get(nombre), archivos['sit'].get(nombre)
+        entradas[nombre] = {
+            'base': cargar_medido('sug', nombre, cargar_base_sugerido, archivos['sug'][nombre], columnas),
+            'bi': bi_por_agencia.get(nombre),
+            'inv': cargar_medido('inv', nombre, limpiar_inventario, archivos['inv'][nombre], a['etiqueta']),
+            'trans': cargar_medido('trans', nombre, procesar_transito, trans) if trans else pd.DataFrame(columns=COLS_TRANSITO),
+            'trasp': cargar_medido('sit', nombre, procesar_traspasos, sit, a['filtro_traspaso']) if sit else pd.DataFrame(columns=COLS_TRASPASO),
+        }
+    return entradas
+
+def calcular_bi_agencias(agencias, sin_conexion=False, horizontes=()):
+    # Todas las agencias en paralelo: el tiempo total queda cerca del archivo más lento
+    from compradia.historico import calcular_bi_historico
+    with ThreadPoolExecutor(max_workers=len(agencias)) as pool_agencias:
+        futuros_bi = {a['nombre']: enviar(pool_agencias, calcular_bi_historico, a['nombre'], sin_conexion, horizontes) for a in agencias}
+        return {nombre: futuro.result() for nombre, futuro in futuros_bi.items()}
+
+def generar_reporte(agencias, archivos, historico='drive', rapido=True, solo_valores=False, progreso=None, delta=False,
+                    horizontes=()):
+    # historico: 'drive' (consulta Drive + caché), 'cache' (solo caché local) o None (sin HITS/PROMEDIO calculados)
+    # delta: solo se arman las filas cuyas entradas cambiaron desde la corrida anterior (compradia.delta)
+    # horizontes: meses de las columnas opcionales HITS/PROMEDIO a otros horizontes, p.ej. (3, 6), al final de cada hoja
+    # Devuelve (buffer con el Excel, {agencia: DataFrame}, {agencia: CAMBIOS} o None) o (None, None, None) si algún
+    # archivo base no se pudo leer.
+    from compradia.excel import escribir_reporte
+    avisar = progreso or (lambda pct, texto: None)
+
+    avisar(20, "📊 Consultando histórico de ventas en Drive (HITS)..." if historico == 'drive' else "📊 Calculando histórico de ventas (HITS)...")
+    bi_por_agencia = calcular_bi_agencias(agencias, historico == 'cache', horizontes) if historico else {}
+
+    avisar(50, "⚙️ Cruzando bases de inventarios y tránsitos...")
+    entradas = cargar_entradas(agencias, archivos, bi_por_agencia)
+    if any(e['base'] is None for e in entradas.values()): return None, None, None
+    cambios = None
+    with etapa('hojas', filas_entrada=sum(len(e['base']) for e in entradas.values()), delta=delta) as e:
+        with ThreadPoolExecutor(max_workers=len(agencias)) as pool_hojas:
+            if delta:
+                hojas, cambios, recalculadas = construir_hojas_delta(agencias, entradas, pool_hojas)
+                e['filas_recalculadas'] = sum(recalculadas.values())
+                e['filas_cambios'] = sum(len(df) for df in cambios.values())
+            else: hojas = construir_hojas(agencias, entradas, pool_hojas)
+        e['filas_salida'] = sum(len(df) for df in hojas.values())
+
+    avisar(80, "🎨 Aplicando diseño corporativo y fórmulas...")
+    with etapa('excel', filas_entrada=e['filas_salida'], rapido=rapido) as e:
+        buffer = escribir_reporte(io.BytesIO(), agencias, hojas, rapido, solo_valores, cambios)
+        e['bytes_salida'] = buffer.getbuffer().nbytes
+    return buffer, hojas, cambios
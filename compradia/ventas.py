@@ -0,0 +1,154 @@
+import io
+import os
+import time
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+# Columnas del MASTER que usa el cálculo de HITS y PROMEDIO
+COLS_VENTAS = ['AÑO', 'MES', 'NP', 'CANTIDAD']
+# Agregado mensual por (NP, PERIODO): base de cualquier ventana de HITS / PROMEDIO
+COLS_AGREGADO = ['NP', 'PERIODO', 'EVENTOS', 'NEGATIVOS', 'CANTIDAD']
+
+_pool_parseo = None
+
+def pool_parseo():
+    # Un solo pool por proceso; sobrevive a los reruns de Streamlit porque el módulo queda importado
+    global _pool_parseo
+    if _pool_parseo is None:
+        _pool_parseo = ProcessPoolExecutor(
+            max_workers=min(4, os.cpu_count() or 1), mp_context=multiprocessing.get_context('spawn')
+        )
+    return _pool_parseo
+
+def reiniciar_pool_parseo():
+    global _pool_parseo
+    if _pool_parseo is not None: _pool_parseo.shutdown(wait=False, cancel_futures=True)
+    _pool_parseo = None
+
+def parsear_master(contenido, nombre_archivo):
+    engine = 'xlrd' if 'xls' in nombre_archivo and 'xlsx' not in nombre_archivo else 'openpyxl'
+    df_temp = pd.read_excel(io.BytesIO(contenido), engine=engine)
+    df_temp.columns = df_temp.columns.str.upper().str.strip()
+    rename_map = {}
+    for col in df_temp.columns:
+        if 'AÑO' in col or 'ANIO' in col: rename_map[col] = 'AÑO'
+        if 'MES' in col and 'PROMEDIO' not in col: rename_map[col] = 'MES'
+    df_temp.rename(columns=rename_map, inplace=True)
+    if 'AÑO' not in df_temp.columns or 'MES' not in df_temp.columns: return None
+    return df_temp[[c for c in COLS_VENTAS if c in df_temp.columns]]
+
+def parsear_master_cronometrado(contenido, nombre_archivo):
+    # Corre en el proceso del pool: el tiempo de parseo se mide allá y viaja con el resultado
+    inicio = time.perf_counter()
+    df = parsear_master(contenido, nombre_archivo)
+    return df, time.perf_counter() - inicio
+
+MESES_NUM = {
+    'ENERO': 1, 'FEBRERO': 2, 'MARZO': 3, 'ABRIL': 4, 'MAYO': 5, 'JUNIO': 6,
+    'JULIO': 7, 'AGOSTO': 8, 'SEPTIEMBRE': 9, 'OCTUBRE': 10, 'NOVIEMBRE': 11, 'DICIEMBRE': 12,
+    'ENE': 1, 'FEB': 2, 'MAR': 3, 'ABR': 4, 'MAY': 5, 'JUN': 6,
+    'JUL': 7, 'AGO': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DIC': 12
+}
+
+def mapear_mes_a_numero(mes_texto):
+    if not isinstance(mes_texto, str): return 0
+    return MESES_NUM.get(mes_texto.upper().strip(), 0)
+
+def mapear_meses(serie):
+    # Tabla de búsqueda: cada texto distinto se traduce una sola vez y se expande por código
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=False)
+    tabla = np.array([mapear_mes_a_numero(m) for m in unicos], dtype=np.int64)
+    return tabla[codigos]
+
+def codificar_np(serie):
+    # Códigos enteros ordenados como el texto; -1 = NP vacío (groupby lo descartaría)
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=False)
+    codigos_limpios, nps = pd.factorize(pd.Series(unicos).astype(str).str.strip(), sort=True)
+    return codigos_limpios[codigos], nps
+
+def periodos_ventana(meses=12, hoy=None):
+    # Ventana [inicio, fin): el mes en curso queda fuera
+    hoy = hoy or datetime.datetime.now()
+    fecha_inicio = hoy - relativedelta(months=meses)
+    return fecha_inicio.year * 100 + fecha_inicio.month, hoy.year * 100 + hoy.month
+
+def a_numero(serie):
+    # pd.to_numeric(errors='coerce').fillna(0); en columnas de texto se convierte cada valor distinto una sola vez
+    if serie.dtype != object:
+        return pd.to_numeric(serie, errors='coerce').fillna(0).to_numpy()
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=False)
+    return pd.to_numeric(pd.Series(unicos, dtype=object), errors='coerce').fillna(0).to_numpy()[codigos]
+
+def agregar_mensual(df):
+    if 'NP' not in df.columns or 'CANTIDAD' not in df.columns: return None
+    codigos_np, nps = codificar_np(df['NP'])
+    cantidad = a_numero(df['CANTIDAD'])
+    periodo = a_numero(df['AÑO']).astype(int) * 100 + mapear_meses(df['MES'])
+    codigos_periodo, periodos = pd.factorize(periodo, sort=True)
+    # Una sola llave entera (NP, PERIODO) ordenada igual que el texto; -1 = NP vacío
+    validos = codigos_np >= 0
+    llave = codigos_np[validos].astype(np.int64) * len(periodos) + codigos_periodo[validos]
+    cantidad = cantidad[validos]
+    # Llaves densas para bincount; si el producto NP x PERIODO es disperso se compactan primero
+    if len(nps) * len(periodos) > max(2 * len(llave), 1 << 20):
+        llave, llaves = pd.factorize(llave, sort=True)
+    else:
+        llaves = np.arange(len(nps) * len(periodos))
+    eventos = np.bincount(llave, minlength=len(llaves))
+    negativos = np.bincount(llave, weights=cantidad < 0, minlength=len(llaves)).astype(np.int64)
+    if np.array_equal(cantidad, np.round(cantidad)):
+        suma = np.bincount(llave, weights=cantidad, minlength=len(llaves)) # Enteros: suma exacta
+    else:
+        suma = pd.Series(cantidad).groupby(llave).sum().reindex(range(len(llaves)), fill_value=0).to_numpy()
+    presentes = np.flatnonzero(eventos)
+    llaves = np.asarray(llaves)[presentes]
+    return pd.DataFrame({
+        'NP': nps.take(llaves // len(periodos)),
+        'PERIODO': periodos.take(llaves % len(periodos)),
+        'EVENTOS': eventos[presentes],
+        'NEGATIVOS': negativos[presentes],
+        'CANTIDAD': suma[presentes],
+    })
+
+def resumir_ventana(agregado, p_inicio, p_fin, meses=12):
+    mask = (agregado['PERIODO'] >= p_inicio) & (agregado['PERIODO'] < p_fin)
+    ventana = agregado.loc[mask]
+    if ventana.empty: return None
+    resumen = ventana.groupby('NP', as_index=False)[['EVENTOS', 'NEGATIVOS', 'CANTIDAD']].sum()
+    resumen['HITS_CALCULADO'] = (resumen['EVENTOS'] - (resumen['NEGATIVOS'] * 2)).clip(lower=0)
+    resumen['PROMEDIO_CALCULADO'] = resumen['CANTIDAD'] / meses
+    return resumen
+
+# --- VARIOS HORIZONTES EN UNA PASADA ---
+# HITS / PROMEDIO a 3, 6, 12... meses sobre las mismas filas mensuales (NP, PERIODO): cada fila cae en el tramo
+# del horizonte más corto que la alcanza, se suma una sola vez por (NP, tramo) y la suma acumulada de los tramos
+# da cada horizonte. Las ventanas son [inicio, p_fin) como en periodos_ventana: el mes en curso queda fuera.
+
+def mes_absoluto(periodo):
+    # AAAAMM -> meses desde el año 0; un mes 0 (texto de mes no reconocido) cuenta como diciembre del año anterior,
+    # que es como queda con el filtro por número de resumir_ventana
+    return (periodo // 100) * 12 + periodo % 100 - 1
+
+def inicio_horizonte(p_fin, meses):
+    k = mes_absoluto(p_fin) - meses
+    return (k // 12) * 100 + k % 12 + 1
+
+def resumir_horizontes(grupos, n_grupos, periodo, eventos, negativos, cantidad, p_fin, horizontes):
+    # grupos = código de NP de cada fila (0..n_grupos-1) -> {meses: (hits, promedio, con_ventas)}, un valor por grupo
+    horizontes = sorted(set(horizontes))
+    antiguedad = mes_absoluto(p_fin) - mes_absoluto(np.asarray(periodo)) # 1 = el mes anterior a p_fin
+    tramo = np.searchsorted(horizontes, antiguedad)
+    validas = (antiguedad >= 1) & (tramo < len(horizontes))
+    llave = np.asarray(grupos)[validas].astype(np.int64) * len(horizontes) + tramo[validas]
+    def acumular(pesos):
+        suma = np.bincount(llave, weights=pesos, minlength=n_grupos * len(horizontes))
+        return suma.reshape(n_grupos, len(horizontes)).cumsum(axis=1)
+    filas = acumular(None)
+    hits = acumular(np.asarray(eventos)[validas]) - 2 * acumular(np.asarray(negativos)[validas])
+    suma = acumular(np.asarray(cantidad)[validas])
+    return {h: (np.clip(hits[:, k], 0, None).round().astype(np.int64), suma[:, k] / h, filas[:, k] > 0)
+            for k, h in enumerate(horizontes)}